@@ -0,0 +1,71 @@
+"""Broadcast fan-out cost of ChatServer.send_message.
+
+Compares serializing the message once per broadcast with the previous
+behaviour of serializing it once per recipient.
+
+    python benchmarks/broadcast_bench.py
+"""
+
+import asyncio
+import time
+
+from reflex_rxchat.server import ChatServer, Conversation, Message
+
+RECIPIENTS: tuple[int, ...] = (100, 1_000, 10_000)
+ROUNDS: int = 20
+
+
+class NullHandler:
+    """Stands in for a WebSocketClientHandler without any network I/O."""
+
+    async def send(self, message) -> None:
+        await self.send_text(message.json())
+
+    async def send_text(self, data: str) -> None:
+        pass
+
+
+def make_server(recipients: int) -> ChatServer:
+    server = ChatServer()
+    conversation = Conversation(
+        id="bench", title="bench", usernames=[f"user{i}" for i in range(recipients)]
+    )
+    server.conversations = {"bench": conversation}
+    server.users = {u: NullHandler() for u in conversation.usernames}  # type: ignore
+    return server
+
+
+async def per_recipient(server: ChatServer, message: Message) -> None:
+    conversation = server.conversations["bench"]
+    conversation.add_message(message)
+    await asyncio.gather(*(server.notify(u, message) for u in conversation.usernames))
+
+
+async def serialize_once(server: ChatServer, message: Message) -> None:
+    await server.send_message(message)
+
+
+async def measure(send, recipients: int) -> float:
+    server = make_server(recipients)
+    message = Message(conversation_id="bench", username="user0", content="x" * 64)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await send(server, message)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+async def main() -> None:
+    print(
+        f"{'recipients':>10} {'per-recipient':>15} {'serialize-once':>15} {'speedup':>8}"
+    )
+    for recipients in RECIPIENTS:
+        before = await measure(per_recipient, recipients)
+        after = await measure(serialize_once, recipients)
+        print(
+            f"{recipients:>10} {before * 1000:>12.2f} ms {after * 1000:>12.2f} ms"
+            f" {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Inbound event decode throughput.
+
+Compares the previous ``json.loads`` + ``Model(**data)`` path with the
+compiled decoders in ``reflex_rxchat.server.codec``.
+
+    python benchmarks/decode_bench.py
+"""
+
+import json
+import time
+from typing import Callable
+
+from reflex_rxchat.server.codec import decode_server_message, loads
+from reflex_rxchat.server.events import (
+    EventUserJoinConversation,
+    Message,
+    ResponseJoinConversation,
+)
+
+ROUNDS: int = 20_000
+
+PAYLOADS: dict[str, str] = {
+    "message": Message(
+        conversation_id="Welcome", username="alice", content="x" * 64
+    ).json(),
+    "join event": EventUserJoinConversation(
+        conversation_id="Welcome", username="alice"
+    ).json(),
+    "join response": ResponseJoinConversation(
+        conversation_id="Welcome", users=[f"user{i}" for i in range(20)]
+    ).json(),
+}
+
+MODELS: dict[str, type] = {
+    "conversation.message": Message,
+    "event.conversation.join": EventUserJoinConversation,
+    "response.conversation.join": ResponseJoinConversation,
+}
+
+
+def validated(payload: str):
+    data = json.loads(payload)
+    return MODELS[data["event"]](**data)
+
+
+def compiled(payload: str):
+    return decode_server_message(loads(payload))
+
+
+def throughput(decode: Callable[[str], object], payload: str) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        decode(payload)
+    return ROUNDS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    print(f"backend: {loads.__module__}")
+    print(f"{'event':>14} {'validated':>12} {'compiled':>12} {'speedup':>8}")
+    for name, payload in PAYLOADS.items():
+        before = throughput(validated, payload)
+        after = throughput(compiled, payload)
+        print(f"{name:>14} {before:>8.0f}/s {after:>10.0f}/s {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
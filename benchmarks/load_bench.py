@@ -0,0 +1,183 @@
+"""End-to-end load generator for the chat router.
+
+Starts the FastAPI ``router`` under uvicorn in a separate process and drives
+simulated ``WebSocketChatClient`` users spread over several conversations.
+Results are printed as JSON so runs can be compared between releases.
+
+    python benchmarks/load_bench.py --users 200 --conversations 10 --messages 20
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import statistics
+import sys
+import time
+from typing import Any
+
+import psutil
+
+from reflex_rxchat.client import WebSocketChatClient
+from reflex_rxchat.server import Message
+
+
+def serve(port: int) -> None:
+    import uvicorn
+    from fastapi import FastAPI
+    from reflex_rxchat.server.api import router
+
+    app = FastAPI()
+    app.include_router(router)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+class SimulatedUser:
+    def __init__(self, base_url: str, username: str, conversation_id: str) -> None:
+        self.client = WebSocketChatClient(base_url=base_url)
+        self.username = username
+        self.conversation_id = conversation_id
+        self.latencies: list[float] = []
+        self.received: int = 0
+        self.joined: asyncio.Event = asyncio.Event()
+
+    async def connect(self, batching: bool, binary: bool) -> None:
+        await self.client.connect(self.username, batching=batching, binary=binary)
+        self._reader = asyncio.create_task(self.read())
+        await self.client.join_conversation(self.conversation_id)
+
+    async def read(self) -> None:
+        async for event in self.client.receive():
+            if not isinstance(event, Message):
+                if getattr(event, "username", self.username) == self.username:
+                    self.joined.set()
+                continue
+            if event.username.startswith("user"):
+                self.latencies.append(time.perf_counter() - float(event.content))
+                self.received += 1
+
+    async def send(self, messages: int, interval: float) -> None:
+        for _ in range(messages):
+            await self.client.send_message(
+                self.conversation_id, str(time.perf_counter())
+            )
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        self._reader.cancel()
+        await self.client.disconnect()
+
+
+def percentile(values: list[float], p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+async def run(args: argparse.Namespace, server: psutil.Process) -> dict[str, Any]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_for_port(args.port)
+    users = [
+        SimulatedUser(base_url, f"user{i}", f"room{i % args.conversations}")
+        for i in range(args.users)
+    ]
+    for user in users:
+        await user.connect(args.batching, args.binary)
+    await asyncio.wait_for(asyncio.gather(*(u.joined.wait() for u in users)), 30)
+
+    rss_before = server.memory_info().rss
+    cpu_before = sum(server.cpu_times()[:2])
+    members = [args.users // args.conversations] * args.conversations
+    for i in range(args.users % args.conversations):
+        members[i] += 1
+    expected = sum(m * m * args.messages for m in members)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(u.send(args.messages, 1 / args.rate) for u in users))
+    deadline = time.monotonic() + args.drain_timeout
+    while sum(u.received for u in users) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    cpu = sum(server.cpu_times()[:2]) - cpu_before
+    rss_after = server.memory_info().rss
+    for user in users:
+        await user.close()
+
+    sent = args.users * args.messages
+    delivered = sum(u.received for u in users)
+    latencies = [latency for u in users for latency in u.latencies]
+    return {
+        "users": args.users,
+        "conversations": args.conversations,
+        "batching": args.batching,
+        "binary": args.binary,
+        "messages_sent": sent,
+        "messages_delivered": delivered,
+        "messages_expected": expected,
+        "elapsed_s": round(elapsed, 4),
+        "sent_per_s": round(sent / elapsed, 1),
+        "delivered_per_s": round(delivered / elapsed, 1),
+        "fanout_latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+        "server_rss_growth_bytes": rss_after - rss_before,
+        "server_cpu_us_per_message": round(cpu / sent * 1e6, 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=10, help="per user")
+    parser.add_argument("--rate", type=float, default=20, help="messages/s per user")
+    parser.add_argument("--batching", action="store_true")
+    parser.add_argument("--binary", action="store_true", help="MessagePack frames")
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+    args.port = args.port or free_port()
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(args.port,), daemon=True
+    )
+    process.start()
+    try:
+        report = asyncio.run(run(args, psutil.Process(process.pid)))
+    finally:
+        process.terminate()
+        process.join()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text, file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
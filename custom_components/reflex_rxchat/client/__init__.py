@@ -1,4 +1,5 @@
 from .ws_client import WebSocketChatClient
 from .rest_client import ChatRestClient
+from .direct_client import DirectChatClient
 
-__all__ = ["WebSocketChatClient", "ChatRestClient"]
+__all__ = ["WebSocketChatClient", "ChatRestClient", "DirectChatClient"]
@@ -0,0 +1,59 @@
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from reflex_rxchat.server import ChatServer, ClientMessage
+from reflex_rxchat.server.direct import DirectClientHandler
+from reflex_rxchat.server.events import ServerMessage
+
+from .ws_client import WebSocketChatClient
+
+
+class DirectChatClient(WebSocketChatClient):
+    """WebSocketChatClient talking to a ChatServer in the same process.
+
+    Events are exchanged as objects over the queues of a DirectClientHandler,
+    without a socket or any encoding. ``batching`` and ``binary`` are accepted
+    for compatibility and ignored. Received events are shared with the server
+    and must not be modified.
+    """
+
+    def __init__(self, chat_server: ChatServer) -> None:
+        self.chat_server: ChatServer = chat_server
+        self.handler: Optional[DirectClientHandler] = None
+        self.ws = None
+        self.username: Optional[str] = None
+        self.binary: bool = False
+        self.batching: bool = False
+        self.conversations: dict[str, int] = {}
+
+    async def connect(
+        self, username: str, batching: bool = False, binary: bool = False
+    ):
+        if self.handler is not None:
+            await self.handler.stop()
+        self.handler = self.chat_server.connect_direct(username)
+        self.username = username
+        self.batching = batching
+
+    async def receive(self) -> AsyncGenerator[ServerMessage, None]:
+        assert (
+            self.handler is not None
+        ), "ChatClient.handler can't be None when calling receive()"
+        outbound: asyncio.Queue = self.handler.outbound
+        while True:
+            message = await outbound.get()
+            outbound.task_done()
+            if message is None:
+                return
+            self._track(message)
+            yield message
+
+    async def send(self, message: ClientMessage):
+        assert (
+            self.handler is not None
+        ), "ChatClient.handler can't be None when calling send()"
+        await self.handler.inbound.put(message)
+
+    async def disconnect(self):
+        if self.handler is not None:
+            await self.handler.stop()
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+
+from reflex_rxchat.server import ChatServer
+from reflex_rxchat.server.events import EventType, Message
+
+from .direct_client import DirectChatClient
+
+
+async def next_events(client: DirectChatClient, n: int) -> list:
+    events = []
+    async for message in client.receive():
+        events.append(message)
+        if len(events) == n:
+            return events
+    return events
+
+
+@pytest.mark.asyncio
+async def test_direct_client_round_trip():
+    server = ChatServer()
+    alice, bob = DirectChatClient(server), DirectChatClient(server)
+    await alice.connect("alice")
+    await bob.connect("bob")
+    await alice.join_conversation("Tech")
+    await bob.join_conversation("Tech")
+    await bob.send_message("Tech", "hi")
+
+    events = await asyncio.wait_for(next_events(alice, 3), 1)
+    assert [e.event for e in events] == [
+        EventType.RESPONSE_CONVERSATION_JOIN,
+        EventType.EVENT_CONVERSATION_JOIN,
+        EventType.EVENT_CONVERSATION_JOIN,
+    ]
+    (message,) = await asyncio.wait_for(next_events(alice, 1), 1)
+    assert isinstance(message, Message)
+    assert message is server.conversations["Tech"].messages[-1]
+    assert alice.conversations == {"Tech": 3}
+    assert server.direct_users == {"alice", "bob"}
+
+    await bob.disconnect()
+    assert "bob" not in server.users
+    assert "bob" not in server.conversations["Tech"].usernames
+    assert "bob" not in server.direct_users
+
+
+@pytest.mark.asyncio
+async def test_direct_client_reconnect_replays_missed_events():
+    server = ChatServer()
+    alice, bob = DirectChatClient(server), DirectChatClient(server)
+    await alice.connect("alice")
+    await bob.connect("bob")
+    await alice.join_conversation("Tech")
+    await bob.join_conversation("Tech")
+    await asyncio.wait_for(next_events(alice, 3), 1)
+
+    await alice.disconnect()
+    await bob.send_message("Tech", "missed")
+    await alice.reconnect()
+
+    events = await asyncio.wait_for(next_events(alice, 3), 1)
+    assert events[0].event == EventType.RESPONSE_CONVERSATION_JOIN
+    assert [e.content for e in events[1:]] == ["User alice disconnected.", "missed"]
+    await alice.disconnect()
+    await bob.disconnect()
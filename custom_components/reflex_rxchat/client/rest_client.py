@@ -1,42 +1,161 @@
+import asyncio
 import aiohttp
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+DEFAULT_CONNECTION_LIMIT: int = 100
+DEFAULT_KEEPALIVE_TIMEOUT: float = 30.0
+DEFAULT_REQUEST_TIMEOUT: float = 30.0
 
 
 class ChatRestClient:
-    def __init__(self, base_url: str):
-        """Initializes the client with the base URL of the API."""
+    def __init__(
+        self,
+        base_url: str,
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    ):
+        """Initializes the client with the base URL of the API.
+
+        Requests share one pooled keep-alive session, opened on first use in the
+        running event loop. Call ``close()`` or use the client as an async
+        context manager to release its connections.
+        """
         self.base_url = base_url
+        self.limit: int = limit
+        self.limit_per_host: int = limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self.timeout: float = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Optional[asyncio.Task] = None
+        self._conversations: Optional[tuple[str, List[Dict]]] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # A session is bound to the loop that created it.
+            self._close_stale(loop)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+        return self._session
+
+    def _close_stale(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the session opened in another event loop, if any."""
+        session, owner = self._session, self._loop
+        if session is None or session.closed:
+            return
+        if owner is not None and owner.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), owner)
+        else:
+            # Nothing runs on a stopped loop any more, so close it from this one.
+            self._closing = loop.create_task(session.close())
+
+    async def close(self) -> None:
+        """Closes the pooled session and its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._loop = None
+
+    async def __aenter__(self) -> "ChatRestClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
     async def get_conversations(self) -> List[Dict]:
-        """Fetches the list of conversations."""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{self.base_url}/conversations") as response:
-                response.raise_for_status()
-                return await response.json()
+        """Fetches the list of conversations.
+
+        The last list is kept with its ETag and reused when the server answers
+        304 Not Modified.
+        """
+        headers: Dict[str, str] = {}
+        if self._conversations is not None:
+            headers["If-None-Match"] = self._conversations[0]
+        async with self.session.get(
+            f"{self.base_url}/conversations", headers=headers
+        ) as response:
+            if response.status == 304 and self._conversations is not None:
+                return self._conversations[1]
+            response.raise_for_status()
+            conversations = await response.json()
+            etag = response.headers.get("ETag")
+            self._conversations = (etag, conversations) if etag else None
+            return conversations
 
     async def join_conversation(self, username: str, conversation_id: str):
         """Allows a user to join a specific conversation."""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.base_url}/conversation/{conversation_id}/join",
-                params={"username": username},
-            ) as response:
-                response.raise_for_status()
+        async with self.session.post(
+            f"{self.base_url}/conversation/{conversation_id}/join",
+            params={"username": username},
+        ) as response:
+            response.raise_for_status()
 
     async def leave_conversation(self, username: str, conversation_id: str):
         """Allows a user to leave a specific conversation."""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.base_url}/conversation/{conversation_id}/leave",
-                params={"username": username},
-            ) as response:
-                response.raise_for_status()
+        async with self.session.post(
+            f"{self.base_url}/conversation/{conversation_id}/leave",
+            params={"username": username},
+        ) as response:
+            response.raise_for_status()
 
     async def send_message(self, username: str, conversation_id: str, content: str):
         """Allows a user to send a message in a specific conversation."""
-        async with aiohttp.ClientSession() as session:
-            async with session.put(
-                f"{self.base_url}/conversation/{conversation_id}/message",
-                params={"username": username, "content": content},
-            ) as response:
-                response.raise_for_status()
+        async with self.session.put(
+            f"{self.base_url}/conversation/{conversation_id}/message",
+            params={"username": username, "content": content},
+        ) as response:
+            response.raise_for_status()
+
+    async def send_messages(self, messages: List[Dict]) -> int:
+        """Sends many messages in one request.
+
+        Each message is a dict with ``username``, ``conversation_id`` and
+        ``content``. Returns the number of accepted messages.
+        """
+        async with self.session.post(
+            f"{self.base_url}/conversations/messages", json={"messages": messages}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["accepted"]
+
+    async def update_members(self, operations: List[Dict]) -> int:
+        """Applies many joins and leaves in one request.
+
+        Each operation is a dict with ``username``, ``conversation_id`` and an
+        ``action`` of ``"join"`` or ``"leave"``.
+        """
+        async with self.session.post(
+            f"{self.base_url}/conversations/members", json={"operations": operations}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["accepted"]
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """Fetches a page of history around a message ``seq`` cursor, oldest first."""
+        params: Dict[str, int] = {"limit": limit}
+        if before is not None:
+            params["before"] = before
+        if after is not None:
+            params["after"] = after
+        async with self.session.get(
+            f"{self.base_url}/conversation/{conversation_id}/messages", params=params
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
@@ -1,19 +1,23 @@
+import asyncio
 import pytest
+import pytest_asyncio
 import aiohttp
 from .rest_client import ChatRestClient
 from unittest.mock import AsyncMock, MagicMock
 
 
-@pytest.fixture
-def chat_client():
+@pytest_asyncio.fixture
+async def chat_client():
     base_url = "http://testserver"
-    client = ChatRestClient(base_url=base_url)
-    return client
+    async with ChatRestClient(base_url=base_url) as client:
+        yield client
 
 
-def mock_response(data: dict | None = None, status_code=200):
+def mock_response(data: dict | None = None, status_code=200, headers=None):
     response = AsyncMock()
     response.json.return_value = data
+    response.status = status_code
+    response.headers = headers or {}
     response.raise_for_status = MagicMock()
     return AsyncMock(
         __aenter__=AsyncMock(return_value=response), status_code=status_code
@@ -81,3 +85,88 @@ async def test_send_message(chat_client: ChatRestClient, mocker):
         username=username, conversation_id=conversation_id, content=content
     )
     aiohttp.ClientSession.put.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused(chat_client: ChatRestClient, mocker):
+    """Test consecutive requests share one pooled session until closed."""
+    mocker.patch("aiohttp.ClientSession.post", return_value=mock_response())
+
+    await chat_client.join_conversation("test_user", "123")
+    session = chat_client.session
+    await chat_client.leave_conversation("test_user", "123")
+
+    assert chat_client.session is session
+    assert session.connector.limit == chat_client.limit
+    await chat_client.close()
+    assert session.closed
+    assert chat_client.session is not session
+
+
+@pytest.mark.asyncio
+async def test_bulk_methods(chat_client: ChatRestClient, mocker):
+    """Test bulk sends and membership updates post one JSON body each."""
+    mocker.patch(
+        "aiohttp.ClientSession.post", return_value=mock_response({"accepted": 2})
+    )
+    messages = [
+        {"username": "a", "conversation_id": "123", "content": "hi"},
+        {"username": "b", "conversation_id": "123", "content": "hey"},
+    ]
+
+    assert await chat_client.send_messages(messages) == 2
+    aiohttp.ClientSession.post.assert_called_once_with(
+        "http://testserver/conversations/messages", json={"messages": messages}
+    )
+
+    operations = [{"username": "a", "conversation_id": "123", "action": "join"}]
+    assert await chat_client.update_members(operations) == 2
+    assert aiohttp.ClientSession.post.call_args.kwargs == {
+        "json": {"operations": operations}
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_messages(chat_client: ChatRestClient, mocker):
+    """Test fetching a page of history passes only the given cursor."""
+    page = [{"seq": 4, "content": "hi"}]
+    mocker.patch("aiohttp.ClientSession.get", return_value=mock_response(page))
+
+    assert await chat_client.get_messages("123", before=5, limit=10) == page
+    aiohttp.ClientSession.get.assert_called_once_with(
+        "http://testserver/conversation/123/messages",
+        params={"limit": 10, "before": 5},
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_conversations_reuses_unmodified_list(
+    chat_client: ChatRestClient, mocker
+):
+    """Test a 304 answer returns the list cached with its ETag."""
+    response_data = [{"id": "123", "users_count": 5}]
+    get = mocker.patch(
+        "aiohttp.ClientSession.get",
+        return_value=mock_response(response_data, headers={"ETag": '"v1"'}),
+    )
+    assert await chat_client.get_conversations() == response_data
+
+    get.return_value = mock_response(status_code=304)
+    assert await chat_client.get_conversations() == response_data
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
+def test_session_from_a_previous_loop_is_closed():
+    """Test switching event loops closes the session of the old one."""
+    client = ChatRestClient(base_url="http://testserver")
+
+    async def open_session() -> aiohttp.ClientSession:
+        session = client.session
+        await asyncio.sleep(0)
+        return session
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(open_session())
+    assert first is not second
+    assert first.closed
+    asyncio.run(client.close())
@@ -1,3 +1,4 @@
+import asyncio
 from typing import AsyncGenerator, Optional
 from aiohttp import (
     ClientSession,
@@ -13,10 +14,16 @@ from reflex_rxchat.server import (
 )
 from reflex_rxchat.server.events import (
     EventType,
-    ServerMessage,
-    EventUserJoinConversation,
-    EventUserLeaveConversation,
+    Pong,
     ResponseJoinConversation,
+    ServerMessage,
+)
+from reflex_rxchat.server.codec import decode_server_message, loads
+from reflex_rxchat.server.wire import (
+    AVAILABLE,
+    SUBPROTOCOL,
+    pack_event,
+    unpack_server_events,
 )
 
 
@@ -26,13 +33,30 @@ class WebSocketChatClient:
         self._session: ClientSession = ClientSession(base_url=base_url)
         self.ws: Optional[ClientWebSocketResponse] = None
         self.username: Optional[str] = None
+        self.binary: bool = False
+        self.batching: bool = False
+        self.conversations: dict[str, int] = {}
+
+    async def connect(
+        self, username: str, batching: bool = False, binary: bool = False
+    ):
+        """Open the chat socket.
 
-    async def connect(self, username: str):
+        With ``batching`` the server may coalesce events. With ``binary`` the
+        client offers the MessagePack subprotocol, if ``msgpack`` is installed,
+        and falls back to JSON when the server does not accept it.
+        """
+        params: dict[str, str] = {"username": username}
+        if batching:
+            params["batch"] = "1"
+        protocols = (SUBPROTOCOL,) if binary and AVAILABLE else ()
         try:
             self.ws = await self._session.ws_connect(
-                "/chat", params={"username": username}
+                "/chat", params=params, protocols=protocols
             )
             self.username = username
+            self.batching = batching
+            self.binary = binary and self.ws.protocol == SUBPROTOCOL
         except WSServerHandshakeError as e:
             await self._session.close()
             raise e
@@ -43,25 +67,86 @@ class WebSocketChatClient:
                 self.ws is not None
             ), "ChatClient.ws can't be None when calling receive()"
             try:
-                data: dict = await self.ws.receive_json()
+                if self.binary:
+                    messages = unpack_server_events(await self.ws.receive_bytes())
+                else:
+                    data: dict | list[dict] = await self.ws.receive_json(loads=loads)
+                    messages = [
+                        decode_server_message(item)
+                        for item in (data if isinstance(data, list) else [data])
+                    ]
             except WSMessageTypeError:
                 return
 
-            match (data.get("event", None)):
-                case EventType.CONVERSATION_MESSAGE:
-                    yield Message(**data)
+            for message in messages:
+                if message.event == EventType.PING:
+                    await self.send(Pong())
+                    continue
+                self._track(message)
+                yield message
 
-                case EventType.RESPONSE_CONVERSATION_JOIN:
-                    yield ResponseJoinConversation(**data)
+    async def receive_batches(
+        self, interval: float
+    ) -> AsyncGenerator[list[ServerMessage], None]:
+        """Yield received events in lists, one per ``interval`` seconds of traffic.
 
-                case EventType.EVENT_CONVERSATION_JOIN:
-                    yield EventUserJoinConversation(**data)
-                case EventType.EVENT_CONVERSATION_LEAVE:
-                    yield EventUserLeaveConversation(**data)
-                case _:
-                    raise RuntimeError(
-                        f"Server received unknown message. payload={data}"
-                    )
+        The first event of a batch starts the interval; everything that arrives
+        before it ends is yielded together.
+        """
+        queue: asyncio.Queue[Optional[ServerMessage]] = asyncio.Queue()
+
+        async def read() -> None:
+            try:
+                async for message in self.receive():
+                    queue.put_nowait(message)
+            finally:
+                queue.put_nowait(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                batch = [message]
+                await asyncio.sleep(interval)
+                ended = False
+                while not queue.empty():
+                    message = queue.get_nowait()
+                    if message is None:
+                        ended = True
+                        break
+                    batch.append(message)
+                yield batch
+                if ended:
+                    break
+            await reader
+        finally:
+            reader.cancel()
+
+    def _track(self, message: ServerMessage) -> None:
+        """Remember the last sequence number seen in each joined conversation."""
+        if message.seq is None:
+            return
+        if isinstance(message, ResponseJoinConversation):
+            self.conversations.setdefault(message.conversation_id, message.seq)
+        elif message.conversation_id in self.conversations:
+            self.conversations[message.conversation_id] = max(
+                self.conversations[message.conversation_id], message.seq
+            )
+
+    async def reconnect(self):
+        """Open a new socket and resume every joined conversation.
+
+        Each room is rejoined with the last sequence number seen, so the server
+        replays only the events missed while disconnected.
+        """
+        assert self.username is not None, "ChatClient.connect() was never called"
+        if self.ws is not None and not self.ws.closed:
+            await self.ws.close()
+        await self.connect(self.username, batching=self.batching, binary=self.binary)
+        for conversation_id, seq in self.conversations.items():
+            await self.join_conversation(conversation_id, since=seq)
 
     async def send_message(self, conversation_id: str, content: str):
         await self.send(
@@ -72,12 +157,20 @@ class WebSocketChatClient:
 
     async def send(self, message: ClientMessage):
         assert self.ws is not None, "ChatClient.ws can't be None when calling send()"
-        await self.ws.send_str(message.json())
+        if self.binary:
+            await self.ws.send_bytes(pack_event(message))
+        else:
+            await self.ws.send_str(message.json())
 
-    async def join_conversation(self, conversation_id: str):
-        await self.send(RequestJoinConversation(conversation_id=conversation_id))
+    async def join_conversation(
+        self, conversation_id: str, since: Optional[int] = None
+    ):
+        await self.send(
+            RequestJoinConversation(conversation_id=conversation_id, since=since)
+        )
 
     async def leave_conversation(self, conversation_id: str):
+        self.conversations.pop(conversation_id, None)
         await self.send(RequestLeaveConversation(conversation_id=conversation_id))
 
     async def message(self, conversation_id: str, content: str):
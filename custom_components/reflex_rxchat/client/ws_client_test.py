@@ -1,7 +1,17 @@
 # type: ignore
+import asyncio
 import pytest
 from unittest.mock import AsyncMock
-from reflex_rxchat.server.events import EventType, Message
+from aiohttp import WSMessageTypeError
+from reflex_rxchat.server.events import (
+    EventType,
+    Message,
+    Ping,
+    Pong,
+    RequestJoinConversation,
+    ResponseJoinConversation,
+)
+from reflex_rxchat.server.wire import AVAILABLE, SUBPROTOCOL, pack_batch, pack_event
 
 from .ws_client import WebSocketChatClient
 
@@ -12,6 +22,9 @@ def client():
     client = WebSocketChatClient(base_url="xyz")
     client._session = AsyncMock()
     client.ws = AsyncMock()
+    client.binary = False
+    client.batching = False
+    client.conversations = {}
     return client
 
 
@@ -81,3 +94,115 @@ async def test_send_plain_message(client: WebSocketChatClient):
     await client.connect(username="testuser")
     await client.message("test_conv", "Hi!")
     client.ws.send_str.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_receive_unpacks_batched_frames(client: WebSocketChatClient):
+    client.ws.receive_json = AsyncMock(
+        side_effect=[
+            [
+                {
+                    "conversation_id": "c",
+                    "username": "a",
+                    "content": "1",
+                    "event": EventType.CONVERSATION_MESSAGE,
+                },
+                {
+                    "conversation_id": "c",
+                    "username": "b",
+                    "event": EventType.EVENT_CONVERSATION_JOIN,
+                },
+            ],
+        ]
+    )
+
+    received = []
+    try:
+        async for m in client.receive():
+            received.append(m)
+    except (StopAsyncIteration, RuntimeError):
+        pass
+    assert [m.event for m in received] == [
+        EventType.CONVERSATION_MESSAGE,
+        EventType.EVENT_CONVERSATION_JOIN,
+    ]
+
+
+@pytest.mark.skipif(not AVAILABLE, reason="msgpack is not installed")
+@pytest.mark.asyncio
+async def test_binary_subprotocol(client: WebSocketChatClient):
+    ws = AsyncMock(protocol=SUBPROTOCOL)
+    client._session.ws_connect.return_value = ws
+    await client.connect(username="testuser", binary=True)
+    assert client._session.ws_connect.await_args.kwargs["protocols"] == (SUBPROTOCOL,)
+    assert client.binary
+
+    message = Message(conversation_id="x", username="testuser", content="y")
+    await client.send(message)
+    ws.send_bytes.assert_awaited_once_with(pack_event(message))
+
+    ws.receive_bytes = AsyncMock(
+        side_effect=[pack_batch([pack_event(message)] * 2), WSMessageTypeError]
+    )
+    assert [m async for m in client.receive()] == [message, message]
+
+
+@pytest.mark.asyncio
+async def test_binary_falls_back_to_json(client: WebSocketChatClient):
+    client._session.ws_connect.return_value = AsyncMock(protocol=None)
+    await client.connect(username="testuser", binary=True)
+    assert not client.binary
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resumes_from_last_seq(client: WebSocketChatClient):
+    await client.connect(username="testuser", batching=True)
+    client.ws.receive_json = AsyncMock(
+        side_effect=[
+            ResponseJoinConversation(conversation_id="Tech", users=[], seq=4).dict(),
+            Message(conversation_id="Tech", username="a", content="x", seq=5).dict(),
+            Message(conversation_id="Other", username="a", content="x", seq=9).dict(),
+            WSMessageTypeError,
+        ]
+    )
+    assert len([m async for m in client.receive()]) == 3
+    assert client.conversations == {"Tech": 5}
+
+    client.ws.closed = False
+    await client.reconnect()
+    assert client._session.ws_connect.await_args.kwargs["params"]["batch"] == "1"
+    client.ws.send_str.assert_awaited_once_with(
+        RequestJoinConversation(conversation_id="Tech", since=5).json()
+    )
+
+    await client.leave_conversation("Tech")
+    assert client.conversations == {}
+
+
+@pytest.mark.asyncio
+async def test_receive_batches_groups_events(client: WebSocketChatClient):
+    messages = [
+        Message(conversation_id="Tech", username="a", content=str(i)) for i in range(3)
+    ]
+    frames = [m.dict() for m in messages] + [WSMessageTypeError]
+
+    async def receive_json(loads):
+        await asyncio.sleep(0)
+        frame = frames.pop(0)
+        if frame is WSMessageTypeError:
+            raise frame
+        return frame
+
+    client.ws.receive_json = receive_json
+    batches = [batch async for batch in client.receive_batches(0.01)]
+    assert batches == [messages]
+
+
+@pytest.mark.asyncio
+async def test_receive_answers_pings(client: WebSocketChatClient):
+    message = Message(conversation_id="Tech", username="a", content="x")
+    client.ws.receive_json = AsyncMock(
+        side_effect=[Ping().dict(), message.dict(), WSMessageTypeError]
+    )
+    assert [m async for m in client.receive()] == [message]
+    client.ws.send_str.assert_awaited_once_with(Pong().json())
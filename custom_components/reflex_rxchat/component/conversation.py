@@ -4,6 +4,7 @@ from reflex_rxchat.server.events import (
     Message,
     EventUserJoinConversation,
     EventUserLeaveConversation,
+    EventConversationPresence,
     ResponseJoinConversation,
     ServerMessage,
 )
@@ -75,6 +76,26 @@ class ConversationMessagesComponent(Component):
             width="100%",
         )
 
+    @classmethod
+    def presence(
+        cls, event: EventConversationPresence, *children, **props
+    ) -> Component:
+        return rx.hstack(
+            rx.icon("users"),
+            rx.card(
+                rx.flex(
+                    rx.foreach(rx.Var.create(event.joined).to(list[str]), rx.badge),
+                    rx.text(" joined "),
+                    rx.foreach(rx.Var.create(event.left).to(list[str]), rx.badge),
+                    rx.text(" left"),
+                    spacing="1",
+                ),
+                align="center",
+                width="100%",
+            ),
+            width="100%",
+        )
+
     @classmethod
     def join_response(
         cls, event: ResponseJoinConversation, *children, **props
@@ -99,6 +120,7 @@ class ConversationMessagesComponent(Component):
             (EventType.CONVERSATION_MESSAGE, cls.message(event)),
             (EventType.EVENT_CONVERSATION_JOIN, cls.join(event)),
             (EventType.EVENT_CONVERSATION_LEAVE, cls.leave(event)),
+            (EventType.EVENT_CONVERSATION_PRESENCE, cls.presence(event)),
             (EventType.RESPONSE_CONVERSATION_JOIN, cls.join_response(event)),
             (rx.text(f"Unknown event type {event.event}")),
         )
@@ -106,6 +128,18 @@ class ConversationMessagesComponent(Component):
     @classmethod
     def create(cls, *children, **props) -> Component:
         return rx.vstack(
+            rx.cond(
+                ChatState.connected & ChatState.has_older,
+                rx.center(
+                    rx.button(
+                        "Load older",
+                        on_click=ChatState.load_older,
+                        variant="ghost",
+                        size="1",
+                    ),
+                    width="100%",
+                ),
+            ),
             rx.foreach(ChatState.messages, cls.event),
             width="100%",
             background_color=rx.color("mauve", 2),
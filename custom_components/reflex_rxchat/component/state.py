@@ -2,14 +2,31 @@ import asyncio
 
 import reflex as rx
 
-from reflex_rxchat.client import WebSocketChatClient
+from reflex_rxchat.client import DirectChatClient, WebSocketChatClient
+from reflex_rxchat.server import api
 from reflex_rxchat.server import ServerMessage, EventType
+from reflex_rxchat.server.codec import decode_server_message
 
 from reflex_rxchat.client import ChatRestClient
 
 CHAT_ENDPOINT: str = "http://localhost:8000"
 chat: ChatRestClient = ChatRestClient(CHAT_ENDPOINT)
 
+# Messages kept in the state; older ones are dropped as new ones arrive.
+MESSAGE_WINDOW: int = 100
+# "Load older" grows the window by one page, up to this many messages.
+MAX_MESSAGE_WINDOW: int = 500
+PAGE_SIZE: int = 50
+# Received events are applied to the state together, once per interval.
+RECEIVE_INTERVAL: float = 0.1
+
+
+def chat_client() -> WebSocketChatClient:
+    """A client for the chat server, in-process when this app serves the router."""
+    if api.chat_server is not None:
+        return DirectChatClient(api.chat_server)
+    return WebSocketChatClient(base_url=CHAT_ENDPOINT)
+
 
 class ChatState(rx.State):
     """The app state."""
@@ -23,11 +40,12 @@ class ChatState(rx.State):
     content: str = ""
     username: str = ""
     conversation_users: list[str] = []
+    conversation_user_count: int = 0
     processing: bool = False
 
-    @rx.var(cache=True)
-    def conversation_user_count(self) -> int:
-        return len(self.conversation_users)
+    message_window: int = MESSAGE_WINDOW
+    has_older: bool = True
+    joined_seq: int = 0
 
     @rx.event(background=True)
     async def connect(self):
@@ -39,27 +57,23 @@ class ChatState(rx.State):
                         "Your username has to be at least 5 characters long"
                     )
                     return
-            ws_chat: WebSocketChatClient = WebSocketChatClient(base_url=CHAT_ENDPOINT)  # type: ignore
+            ws_chat: WebSocketChatClient = chat_client()
             await ws_chat.connect(self.username)
             await ws_chat.join_conversation(self.conversation_id)
             async with self:
                 self.connected = True
-            async for m in ws_chat.receive():
-                print(m)
+            async for batch in ws_chat.receive_batches(RECEIVE_INTERVAL):
+                contents: list[str] = []
                 async with self:
-                    self.messages.append(m)
-                    if m.event == EventType.CONVERSATION_MESSAGE:
-                        yield rx.toast(m.content)
-                    elif m.event == EventType.RESPONSE_CONVERSATION_JOIN:
-                        self.conversation_users = m.users
-                        self.conversation_id = m.conversation_id
-                    elif m.event == EventType.EVENT_CONVERSATION_JOIN:
-                        if m.username not in self.conversation_users:
-                            self.conversation_users.append(m.username)
-                    elif m.event == EventType.EVENT_CONVERSATION_LEAVE:
-                        self.conversation_users.remove(m.username)
-                    else:
-                        pass
+                    for m in batch:
+                        self._apply_event(m)
+                        if m.event == EventType.CONVERSATION_MESSAGE:
+                            contents.append(m.content)
+                    self._trim_messages()
+                    if len(contents) == 1:
+                        yield rx.toast(contents[0])
+                    elif contents:
+                        yield rx.toast(f"{len(contents)} new messages")
         except Exception as ex:
             print(f"Exception chat client {ex}")
             async with self:
@@ -75,6 +89,60 @@ class ChatState(rx.State):
             if ws_chat is not None:
                 await ws_chat.disconnect()
 
+    def _apply_event(self, m: ServerMessage):
+        self.messages.append(m)
+        if m.event == EventType.RESPONSE_CONVERSATION_JOIN:
+            self.conversation_users = m.users
+            self.conversation_id = m.conversation_id
+            self.joined_seq = m.seq or 0
+            self.message_window = MESSAGE_WINDOW
+            self.has_older = True
+            self.conversation_user_count = (
+                len(m.users) if m.users_count is None else m.users_count
+            )
+        elif m.event == EventType.EVENT_CONVERSATION_JOIN:
+            if m.username not in self.conversation_users:
+                self.conversation_users.append(m.username)
+            self.conversation_user_count = len(self.conversation_users)
+        elif m.event == EventType.EVENT_CONVERSATION_LEAVE:
+            self.conversation_users.remove(m.username)
+            self.conversation_user_count = len(self.conversation_users)
+        elif m.event == EventType.EVENT_CONVERSATION_PRESENCE:
+            # Large rooms send no member list, only the count.
+            if self.conversation_users:
+                users = [u for u in self.conversation_users if u not in m.left]
+                self.conversation_users = users + [
+                    u for u in m.joined if u not in users
+                ]
+            self.conversation_user_count = m.users_count
+
+    def _trim_messages(self):
+        excess = len(self.messages) - self.message_window
+        if excess > 0:
+            self.messages = self.messages[excess:]
+
+    @rx.event
+    async def load_older(self):
+        """Prepend the page of history before the oldest message in the window."""
+        seqs = [
+            m.seq
+            for m in self.messages
+            if m.seq is not None
+            and m.conversation_id == self.conversation_id
+            and m.event != EventType.RESPONSE_CONVERSATION_JOIN
+        ]
+        before = min(seqs) if seqs else self.joined_seq + 1
+        # Only ask for what still fits under the cap, so nothing newer is dropped.
+        limit = min(PAGE_SIZE, MAX_MESSAGE_WINDOW - len(self.messages))
+        if limit <= 0:
+            self.has_older = False
+            return
+        page = await chat.get_messages(self.conversation_id, before=before, limit=limit)
+        older = [decode_server_message(m) for m in page[-limit:]]
+        self.messages = older + self.messages
+        self.message_window = max(self.message_window, len(self.messages))
+        self.has_older = len(page) >= limit and self.message_window < MAX_MESSAGE_WINDOW
+
     @rx.event
     async def change_conversation(self, conversation_id: str):
         await chat.leave_conversation(self.username, self.conversation_id)
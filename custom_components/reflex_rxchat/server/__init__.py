@@ -16,6 +16,11 @@ from .events import (  # noqa: E402
     RequestJoinConversation,
 )
 from .models import Conversation  # noqa: E402
+from .websocket_handler import OverflowPolicy  # noqa: E402
+from .storage import HistoryStore, SQLiteHistoryStore  # noqa: E402
+from .broker import MessageBroker, InProcessBroker, UnixSocketBroker  # noqa: E402
+from .metrics import MetricsRegistry  # noqa: E402
+from .ratelimit import RateLimiter, RateLimitPolicy  # noqa: E402
 
 __all__ = [
     "EventType",
@@ -26,4 +31,13 @@ __all__ = [
     "Message",
     "RequestLeaveConversation",
     "RequestJoinConversation",
+    "OverflowPolicy",
+    "HistoryStore",
+    "SQLiteHistoryStore",
+    "MessageBroker",
+    "InProcessBroker",
+    "UnixSocketBroker",
+    "MetricsRegistry",
+    "RateLimiter",
+    "RateLimitPolicy",
 ]
@@ -1,17 +1,59 @@
 import asyncio
+import json
+import math
 from . import logger
-from fastapi import WebSocket, APIRouter, FastAPI
+from fastapi import WebSocket, APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response
 from reflex_rxchat.server.chat_server import ChatServer
-from typing import List
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel
+from pydantic.v1.json import pydantic_encoder
 import uuid
-from reflex_rxchat.server.events import Message
+from itertools import groupby
+from reflex_rxchat.server.events import Message, ServerMessage
+from reflex_rxchat.server.models import Conversation
+from reflex_rxchat.server.metrics import CONTENT_TYPE
+from reflex_rxchat.server.ratelimit import RateLimitExceeded
+from reflex_rxchat.server import wire
 from contextlib import asynccontextmanager
 
 
+chat_server_options: dict[str, Any] = {}
+JSON: str = "application/json"
+DEFAULT_PAGE_SIZE: int = 50
+MAX_PAGE_SIZE: int = 200
+
+
+class BulkMessage(BaseModel):
+    username: str
+    conversation_id: str
+    content: str
+
+
+class BulkMessages(BaseModel):
+    messages: List[BulkMessage]
+
+
+class MembershipOperation(BaseModel):
+    username: str
+    conversation_id: str
+    action: Literal["join", "leave"]
+
+
+class BulkMemberships(BaseModel):
+    operations: List[MembershipOperation]
+
+
+def configure_chat_server(**options: Any) -> None:
+    """Set the ChatServer keyword arguments used when the router starts."""
+    chat_server_options.update(options)
+
+
 @asynccontextmanager
 async def lifespan_chat_server(app: FastAPI):
     global chat_server
-    chat_server = ChatServer()
+    chat_server = ChatServer(**chat_server_options)
+    await chat_server.start()
     logger.info("ChatServer started")
     yield
     logger.info("ChatServer closing ... ")
@@ -30,36 +72,97 @@ router = APIRouter(lifespan=lifespan_chat_server)
 @router.websocket("/chat")
 async def connect_chat(websocket: WebSocket):
     username: str = websocket.query_params.get("username", str(uuid.uuid4()))
+    batching: bool = websocket.query_params.get("batch") == "1"
+    binary: bool = wire.AVAILABLE and wire.SUBPROTOCOL in websocket.scope.get(
+        "subprotocols", ()
+    )
     try:
-        await chat_server.handle_user_websocket(username, websocket)
+        await chat_server.handle_user_websocket(username, websocket, batching, binary)
     finally:
         await chat_server.handle_user_disconnected(username)
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    if chat_server.metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(chat_server.metrics.render(), media_type=CONTENT_TYPE)
+
+
+def _get_conversation(conversation_id: str) -> Conversation:
+    conversation = chat_server.get_conversation(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation
+
+
+def _json_list(messages: List[ServerMessage]) -> str:
+    return "[" + ",".join(m.json() for m in messages) + "]"
+
+
 @router.get("/conversation/{conversation_id}")
-async def get_conversation_id(conversation_id: str) -> dict:
-    return chat_server.get_conversations()[conversation_id].tail(10).dict()
+async def get_conversation_id(conversation_id: str) -> Response:
+    conversation = _get_conversation(conversation_id)
+    messages = await chat_server.page(conversation_id, 10) or []
+    data = {
+        "id": conversation.id,
+        "title": conversation.title,
+        "users_count": conversation.user_count(),
+        "messages": [m.dict() for m in messages],
+    }
+    return Response(json.dumps(data, default=pydantic_encoder), media_type=JSON)
+
+
+@router.get("/conversation/{conversation_id}/messages")
+async def get_conversation_messages(
+    conversation_id: str,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> Response:
+    """Page through history by sequence number, oldest message first.
+
+    Pass the ``seq`` of the first message as ``before`` to load older messages,
+    or the last one as ``after`` to load newer ones.
+    """
+    messages = await chat_server.page(
+        conversation_id, limit, before=before, after=after
+    )
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return Response(_json_list(messages), media_type=JSON)
 
 
-@router.get("/conversations", response_model=List[dict])
-async def get_conversations():
-    response = []
-    conversations = chat_server.get_conversations()
-    for conversation in conversations.values():
-        response.append(
-            {"id": conversation.id, "users_count": conversation.user_count()}
+@router.get("/conversations")
+async def get_conversations(request: Request) -> Response:
+    data, etag = chat_server.directory()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(data, media_type=JSON, headers={"ETag": etag})
+
+
+async def _admit(username: str, conversation_id: str) -> bool:
+    """Apply the rate limit, answering 429 when it rejects the request."""
+    try:
+        return await chat_server.admit(username, conversation_id)
+    except RateLimitExceeded as ex:
+        raise HTTPException(
+            status_code=429,
+            detail=str(ex),
+            headers={"Retry-After": str(math.ceil(ex.retry_after))},
         )
-    return response
 
 
 @router.post("/conversation/{conversation_id}/join")
 async def join_conversation(username: str, conversation_id: str):
-    await chat_server.user_join(username, conversation_id)
+    if await _admit(username, conversation_id):
+        await chat_server.user_join(username, conversation_id)
 
 
 @router.post("/conversation/{conversation_id}/leave")
 async def leave_conversation(username: str, conversation_id: str):
-    await chat_server.user_leave(username, conversation_id)
+    if await _admit(username, conversation_id):
+        await chat_server.user_leave(username, conversation_id)
 
 
 @router.put("/conversation/{conversation_id}/message")
@@ -67,4 +170,63 @@ async def message(username: str, conversation_id: str, content: str):
     message = Message(
         username=username, conversation_id=conversation_id, content=content
     )
-    await chat_server.send_message(message)
+    if await _admit(username, conversation_id):
+        await chat_server.send_message(message)
+
+
+async def _admitted(username: str, conversation_id: str) -> bool:
+    try:
+        return await chat_server.admit(username, conversation_id)
+    except RateLimitExceeded:
+        return False
+
+
+@router.post("/conversations/messages")
+async def bulk_messages(body: BulkMessages) -> dict:
+    """Send many messages; those over a rate limit are left out of ``accepted``.
+
+    Messages for conversations that do not exist are skipped and their ids are
+    listed under ``unknown``.
+    """
+    conversations = chat_server.get_conversations()
+    unknown = list(
+        dict.fromkeys(
+            m.conversation_id
+            for m in body.messages
+            if m.conversation_id not in conversations
+        )
+    )
+    messages = [
+        m
+        for m in body.messages
+        if m.conversation_id in conversations
+        and await _admitted(m.username, m.conversation_id)
+    ]
+    await chat_server.send_messages(
+        Message(
+            username=m.username, conversation_id=m.conversation_id, content=m.content
+        )
+        for m in messages
+    )
+    return {"accepted": len(messages), "unknown": unknown}
+
+
+@router.post("/conversations/members")
+async def bulk_members(body: BulkMemberships) -> dict:
+    """Apply operations in order, batching runs on the same conversation.
+
+    Operations over a rate limit are left out of ``accepted``.
+    """
+    operations = [
+        op
+        for op in body.operations
+        if await _admitted(op.username, op.conversation_id)
+    ]
+    runs = groupby(operations, key=lambda op: (op.action, op.conversation_id))
+    for (action, conversation_id), ops in runs:
+        usernames = [op.username for op in ops]
+        if action == "join":
+            await chat_server.users_join(conversation_id, usernames)
+        else:
+            await chat_server.users_leave(conversation_id, usernames)
+    return {"accepted": len(operations)}
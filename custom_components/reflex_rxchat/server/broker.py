@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+
+from . import logger
+from .codec import decode_server_message, loads
+from .events import ServerMessage
+
+FRAME_LIMIT: int = 2**20
+
+MessageCallback = Callable[[str, ServerMessage], Awaitable[None]]
+DisconnectCallback = Callable[[str, str], Awaitable[None]]
+NotifyCallback = Callable[[str, str, ServerMessage], Awaitable[None]]
+
+
+class MessageBroker(ABC):
+    """Pub/sub bus connecting the ChatServer of every worker.
+
+    Workers publish room events, disconnects and events for a single user
+    tagged with their own id; the broker hands each one to every subscribed
+    worker, including the publisher, which then delivers it to its local
+    sockets.
+
+    The broker is the one place that numbers room events: each gets the next
+    ``seq`` of its conversation and every worker receives them in the same
+    order, so their windows match.
+    """
+
+    @abstractmethod
+    async def subscribe(
+        self,
+        on_message: MessageCallback,
+        on_disconnect: DisconnectCallback,
+        on_notify: NotifyCallback,
+    ) -> None:
+        """Register a worker's delivery callbacks."""
+        pass
+
+    @abstractmethod
+    async def publish(
+        self, origin: str, message: ServerMessage, last_seq: int = 0
+    ) -> None:
+        """Number a conversation event and deliver it to every worker.
+
+        ``last_seq`` is the newest seq the publisher knows for the conversation,
+        so numbering continues after a restart of the broker.
+        """
+        pass
+
+    @abstractmethod
+    async def publish_disconnect(self, origin: str, username: str) -> None:
+        """Tell every worker that a user's connection has gone away."""
+        pass
+
+    @abstractmethod
+    async def publish_notify(
+        self, origin: str, username: str, message: ServerMessage
+    ) -> None:
+        """Deliver an event to one user, wherever their socket is."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+
+class InProcessBroker(MessageBroker):
+    """Broker for ChatServers sharing one event loop.
+
+    Each worker gets its own copy of an event. Events are delivered one at a
+    time so every worker sees them in numbering order.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: list[
+            tuple[MessageCallback, DisconnectCallback, NotifyCallback]
+        ] = []
+        self.seqs: dict[str, int] = {}
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    async def subscribe(
+        self,
+        on_message: MessageCallback,
+        on_disconnect: DisconnectCallback,
+        on_notify: NotifyCallback,
+    ) -> None:
+        self.subscribers.append((on_message, on_disconnect, on_notify))
+
+    async def publish(
+        self, origin: str, message: ServerMessage, last_seq: int = 0
+    ) -> None:
+        cid: str = message.conversation_id  # type: ignore[assignment]
+        async with self._lock:
+            seq = next_seq(self.seqs, cid, last_seq)
+            for on_message, _, _ in self.subscribers:
+                await on_message(origin, message.copy(update={"seq": seq}))
+
+    async def publish_disconnect(self, origin: str, username: str) -> None:
+        for _, on_disconnect, _ in self.subscribers:
+            await on_disconnect(origin, username)
+
+    async def publish_notify(
+        self, origin: str, username: str, message: ServerMessage
+    ) -> None:
+        for _, _, on_notify in self.subscribers:
+            await on_notify(origin, username, message)
+
+    async def close(self) -> None:
+        self.subscribers.clear()
+
+
+def next_seq(seqs: dict[str, int], conversation_id: str, last_seq: int) -> int:
+    """Give out the next seq of a conversation."""
+    seq = seqs[conversation_id] = max(seqs.get(conversation_id, 0), last_seq) + 1
+    return seq
+
+
+def encode_frame(origin: str, message: ServerMessage, last_seq: int = 0) -> bytes:
+    return (
+        f'{{"last_seq":{last_seq},"origin":{json.dumps(origin)},'
+        f'"message":{message.json()}}}\n'
+    ).encode()
+
+
+def encode_disconnect_frame(origin: str, username: str) -> bytes:
+    return (json.dumps({"origin": origin, "disconnect": username}) + "\n").encode()
+
+
+def encode_notify_frame(origin: str, username: str, message: ServerMessage) -> bytes:
+    return (
+        f'{{"origin":{json.dumps(origin)},"notify":{json.dumps(username)},'
+        f'"message":{message.json()}}}\n'
+    ).encode()
+
+
+class UnixSocketBroker(MessageBroker):
+    """Broker for workers on one machine, relayed through a Unix domain socket.
+
+    The first worker to take the lock file next to ``path`` becomes the hub
+    and relays every newline-delimited frame to all connected workers,
+    numbering room events on the way. The others connect to it and take over
+    the hub role if it goes away.
+    """
+
+    def __init__(self, path: str, retry_interval: float = 0.1) -> None:
+        self.path: str = path
+        self.retry_interval: float = retry_interval
+        self.is_hub: bool = False
+        self._lock_fd: Optional[int] = None
+        self._hub: Optional[asyncio.AbstractServer] = None
+        self._peers: set[asyncio.StreamWriter] = set()
+        self._relays: set[asyncio.Task] = set()
+        self._seqs: dict[str, int] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connected: asyncio.Event = asyncio.Event()
+        self._on_message: Optional[MessageCallback] = None
+        self._on_disconnect: Optional[DisconnectCallback] = None
+        self._on_notify: Optional[NotifyCallback] = None
+
+    async def subscribe(
+        self,
+        on_message: MessageCallback,
+        on_disconnect: DisconnectCallback,
+        on_notify: NotifyCallback,
+    ) -> None:
+        self._on_message = on_message
+        self._on_disconnect = on_disconnect
+        self._on_notify = on_notify
+        self._reader_task = asyncio.create_task(self._run())
+        await self._connected.wait()
+
+    async def publish(
+        self, origin: str, message: ServerMessage, last_seq: int = 0
+    ) -> None:
+        await self._send(encode_frame(origin, message, last_seq))
+
+    async def publish_disconnect(self, origin: str, username: str) -> None:
+        await self._send(encode_disconnect_frame(origin, username))
+
+    async def publish_notify(
+        self, origin: str, username: str, message: ServerMessage
+    ) -> None:
+        await self._send(encode_notify_frame(origin, username, message))
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        await self._stop_hub()
+
+    async def _send(self, frame: bytes) -> None:
+        if self._writer is None:
+            await self._connected.wait()
+        assert self._writer is not None
+        self._writer.write(frame)
+        await self._writer.drain()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reader, self._writer = await self._connect()
+            except OSError:
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self._connected.set()
+            try:
+                while line := await reader.readline():
+                    await self._dispatch(line)
+            except (ConnectionError, ValueError) as ex:
+                logger.warning(f"Broker connection error: {ex!r}")
+            logger.warning(f"Broker hub {self.path} went away, reconnecting")
+            self._connected.clear()
+            self._writer = None
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._hub is None and self._try_lock():
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._hub = await asyncio.start_unix_server(
+                self._relay, self.path, limit=FRAME_LIMIT
+            )
+            self.is_hub = True
+            logger.info(f"Broker hub listening on {self.path}")
+        return await asyncio.open_unix_connection(self.path, limit=FRAME_LIMIT)
+
+    def _try_lock(self) -> bool:
+        import fcntl
+
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _stop_hub(self) -> None:
+        if self._hub is None:
+            return
+        self._hub.close()
+        for peer in list(self._peers):
+            peer.close()
+        await asyncio.gather(*self._relays, return_exceptions=True)
+        await self._hub.wait_closed()
+        self._hub = None
+        self.is_hub = False
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _relay(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._relays.add(task)
+        self._peers.add(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    line = self._number(line)
+                except Exception as ex:
+                    logger.error(f"Unable to relay broker frame {line!r}: {ex!r}")
+                    continue
+                for peer in self._peers:
+                    peer.write(line)
+        except ConnectionError:
+            pass
+        finally:
+            self._peers.discard(writer)
+            self._relays.discard(task)
+            writer.close()
+
+    def _number(self, line: bytes) -> bytes:
+        """Stamp the seq of a room event; other frames pass through as is."""
+        if not line.startswith(b'{"last_seq":'):
+            return line
+        data: dict = loads(line)
+        message = data["message"]
+        message["seq"] = next_seq(
+            self._seqs, message["conversation_id"], data.pop("last_seq")
+        )
+        return (json.dumps(data) + "\n").encode()
+
+    async def _dispatch(self, line: bytes) -> None:
+        try:
+            data: dict = loads(line)
+            origin: str = data["origin"]
+            if "disconnect" in data:
+                assert self._on_disconnect is not None
+                await self._on_disconnect(origin, data["disconnect"])
+                return
+            message = decode_server_message(data["message"])
+            if "notify" in data:
+                assert self._on_notify is not None
+                await self._on_notify(origin, data["notify"], message)
+                return
+            assert self._on_message is not None
+            await self._on_message(origin, message)
+        except Exception as ex:
+            logger.error(f"Unable to dispatch broker frame {line!r}: {ex!r}")
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from reflex_rxchat.server.broker import InProcessBroker, UnixSocketBroker
+from reflex_rxchat.server.chat_server import ChatServer
+from reflex_rxchat.server.events import Message, ResponseJoinConversation
+from reflex_rxchat.server.websocket_handler import WebSocketClientHandler
+
+
+@pytest.mark.asyncio
+async def test_in_process_broker_fans_out_across_workers():
+    broker = InProcessBroker()
+    worker_a, worker_b = ChatServer(broker=broker), ChatServer(broker=broker)
+    await worker_a.start()
+    await worker_b.start()
+    alice = AsyncMock(spec=WebSocketClientHandler)
+    bob = AsyncMock(spec=WebSocketClientHandler)
+    worker_a.users["alice"] = alice
+    worker_b.users["bob"] = bob
+
+    await worker_a.user_join("alice", "Tech")
+    await worker_b.user_join("bob", "Tech")
+    assert list(worker_a.conversations["Tech"].usernames) == ["alice", "bob"]
+
+    message = Message(conversation_id="Tech", username="bob", content="hi")
+    await worker_b.send_message(message)
+    delivered = worker_a.conversations["Tech"].messages[-1]
+    assert delivered.content == "hi"
+    alice.send_text.assert_any_await(delivered.json())
+    bob.send_text.assert_any_await(delivered.json())
+
+    del worker_b.users["bob"]
+    await worker_b.handle_user_disconnected("bob")
+    assert "bob" not in worker_a.conversations["Tech"].usernames
+    assert "bob" not in worker_a.user_conversations
+
+
+@pytest.mark.asyncio
+async def test_join_response_reaches_a_user_on_another_worker():
+    broker = InProcessBroker()
+    worker_a, worker_b = ChatServer(broker=broker), ChatServer(broker=broker)
+    await worker_a.start()
+    await worker_b.start()
+    alice = AsyncMock(spec=WebSocketClientHandler)
+    worker_a.users["alice"] = alice
+
+    # A REST join served by the worker that does not hold alice's socket.
+    await worker_b.user_join("alice", "Tech")
+
+    response = alice.send.await_args_list[0].args[0]
+    assert isinstance(response, ResponseJoinConversation)
+    assert response.conversation_id == "Tech"
+    assert response.users == ["alice"]
+    assert list(worker_a.conversations["Tech"].usernames) == ["alice"]
+
+
+@pytest.mark.asyncio
+async def test_workers_share_the_sender_sequence_numbers():
+    broker = InProcessBroker()
+    worker_a, worker_b = ChatServer(broker=broker), ChatServer(broker=broker)
+    await worker_a.start()
+    await worker_a.send_message(
+        Message(conversation_id="Tech", username="a", content="1")
+    )
+    await worker_b.start()
+    await worker_a.send_message(
+        Message(conversation_id="Tech", username="a", content="2")
+    )
+    await worker_b.send_message(
+        Message(conversation_id="Tech", username="b", content="3")
+    )
+
+    assert [m.seq for m in worker_a.conversations["Tech"].messages] == [1, 2, 3]
+    assert [m.seq for m in worker_b.conversations["Tech"].messages] == [2, 3]
+    assert [m.content for m in worker_a.conversations["Tech"].since(1)] == ["2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_senders_get_unique_ordered_seqs(tmp_path):
+    path = str(tmp_path / "broker.sock")
+    worker_a = ChatServer(broker=UnixSocketBroker(path))
+    worker_b = ChatServer(broker=UnixSocketBroker(path))
+    await worker_a.start()
+    await worker_b.start()
+
+    await asyncio.gather(
+        worker_a.send_message(
+            Message(conversation_id="Tech", username="a", content="A1")
+        ),
+        worker_b.send_message(
+            Message(conversation_id="Tech", username="b", content="B1")
+        ),
+        worker_a.send_message(
+            Message(conversation_id="Tech", username="a", content="A2")
+        ),
+    )
+    windows = [
+        worker_a.conversations["Tech"].messages,
+        worker_b.conversations["Tech"].messages,
+    ]
+    for _ in range(100):
+        if all(len(window) == 3 for window in windows):
+            break
+        await asyncio.sleep(0.01)
+
+    seen = [[(m.content, m.seq) for m in window] for window in windows]
+    assert seen[0] == seen[1]
+    assert [seq for _, seq in seen[0]] == [1, 2, 3]
+    assert sorted(m.content for m in worker_b.conversations["Tech"].since(1)) == sorted(
+        content for content, seq in seen[0] if seq > 1
+    )
+    await worker_b.close()
+    await worker_a.close()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_broker_relays_to_every_worker(tmp_path):
+    path = str(tmp_path / "broker.sock")
+    received: dict[str, list] = {"a": [], "b": []}
+
+    def callbacks(name: str):
+        async def on_message(origin, message):
+            received[name].append((origin, message.content))
+
+        async def on_disconnect(origin, username):
+            received[name].append((origin, username))
+
+        async def on_notify(origin, username, message):
+            received[name].append((username, message.content))
+
+        return on_message, on_disconnect, on_notify
+
+    broker_a, broker_b = UnixSocketBroker(path), UnixSocketBroker(path)
+    await broker_a.subscribe(*callbacks("a"))
+    await broker_b.subscribe(*callbacks("b"))
+    assert broker_a.is_hub and not broker_b.is_hub
+
+    await broker_b.publish(
+        "worker-b", Message(conversation_id="c", username="bob", content="hi")
+    )
+    await broker_a.publish_disconnect("worker-a", "alice")
+    await broker_a.publish_notify(
+        "worker-a", "bob", Message(conversation_id="c", username="x", content="psst")
+    )
+    for _ in range(100):
+        if len(received["a"]) == 3 and len(received["b"]) == 3:
+            break
+        await asyncio.sleep(0.01)
+
+    expected = {("worker-b", "hi"), ("worker-a", "alice"), ("bob", "psst")}
+    assert set(received["a"]) == expected
+    assert set(received["b"]) == expected
+    await broker_b.close()
+    await broker_a.close()
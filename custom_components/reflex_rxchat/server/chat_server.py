@@ -1,19 +1,40 @@
 import asyncio
+import json
+import os
+import struct
+import time
+import uuid
 from . import logger
 from .interfaces import ChatServerInterface, WebSocketClientHandlerInterface
-from .models import Conversation
+from .models import Conversation, OrderedSet
+from .history import DEFAULT_HISTORY_SIZE
+from .storage import HistoryStore
+from .broker import MessageBroker
+from .direct import DirectClientHandler
+from .metrics import Counter, Histogram, MetricsRegistry
+from .presence import PresenceAggregator
+from .ratelimit import RateLimiter
+from .snapshot import DEFAULT_SNAPSHOT_INTERVAL, Snapshot, pack_window, write_snapshot
+from .wire import pack_event
 
 from fastapi.websockets import WebSocket
 from reflex_rxchat.server.events import (
     Message,
     ServerMessage,
+    EventConversationPresence,
     EventUserLeaveConversation,
     EventUserJoinConversation,
     ResponseJoinConversation,
 )
-from typing import Optional
+from typing import Iterable, Optional
 
-from .websocket_handler import WebSocketClientHandler
+from .websocket_handler import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_QUEUE_SIZE,
+    OverflowPolicy,
+    WebSocketClientHandler,
+)
 
 default_conversations: dict[str, Conversation] = {
     "Welcome": Conversation(id="Welcome", title="Welcome"),
@@ -23,9 +44,242 @@ default_conversations: dict[str, Conversation] = {
 
 
 class ChatServer(ChatServerInterface):
-    def __init__(self) -> None:
-        self.conversations: dict[str, Conversation] = default_conversations
+    def __init__(
+        self,
+        history_size: Optional[int] = DEFAULT_HISTORY_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        store: Optional[HistoryStore] = None,
+        broker: Optional[MessageBroker] = None,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        metrics: Optional[MetricsRegistry] = None,
+        presence_interval: Optional[float] = None,
+        large_room_size: Optional[int] = None,
+        heartbeat_interval: Optional[float] = None,
+        heartbeat_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: Optional[float] = DEFAULT_SNAPSHOT_INTERVAL,
+    ) -> None:
+        self.worker_id: str = uuid.uuid4().hex
+        self.broker: Optional[MessageBroker] = broker
+        self.history_size: Optional[int] = history_size
+        self.store: Optional[HistoryStore] = store
+        self.queue_size: int = queue_size
+        self.overflow: OverflowPolicy = overflow
+        self.batch_window: float = batch_window
+        self.batch_size: int = batch_size
+        self.conversations: dict[str, Conversation] = {
+            cid: Conversation(
+                id=cid, title=c.title, history_size=history_size, store=store
+            )
+            for cid, c in default_conversations.items()
+        }
         self.users: dict[str, WebSocketClientHandlerInterface] = {}
+        self.binary_users: set[str] = set()
+        self.direct_users: set[str] = set()
+        self.user_conversations: dict[str, OrderedSet] = {}
+        self.store_seqs: dict[str, int] = {}
+        self.directory_version: int = 0
+        self._directory: Optional[tuple[int, str, str]] = None
+        self.rate_limiter: Optional[RateLimiter] = rate_limiter
+        self.metrics: Optional[MetricsRegistry] = metrics
+        self.ingest_seconds: Optional[Histogram] = None
+        self.fanout_seconds: Optional[Histogram] = None
+        self.send_seconds: Optional[Histogram] = None
+        self.dropped_frames: Optional[Counter] = None
+        if metrics is not None:
+            self._register_metrics(metrics)
+        self.heartbeat_interval: Optional[float] = heartbeat_interval
+        self.heartbeat_timeout: Optional[float] = heartbeat_timeout
+        if heartbeat_interval is not None and heartbeat_timeout is None:
+            self.heartbeat_timeout = 2 * heartbeat_interval
+        self.idle_timeout: Optional[float] = idle_timeout
+        self._reaper: Optional[asyncio.Task] = None
+        self.presence: Optional[PresenceAggregator] = None
+        if presence_interval is not None:
+            self.presence = PresenceAggregator(
+                self.send_messages, presence_interval, large_room_size
+            )
+        self.snapshot_path: Optional[str] = snapshot_path
+        self.snapshot_interval: Optional[float] = snapshot_interval
+        self.snapshot: Optional[Snapshot] = None
+        self.snapshot_seqs: dict[str, int] = {}
+        self._snapshotter: Optional[asyncio.Task] = None
+        self._snapshot_write: Optional[asyncio.Future] = None
+
+    def _register_metrics(self, metrics: MetricsRegistry) -> None:
+        self.ingest_seconds = metrics.histogram(
+            "rxchat_message_ingest_seconds",
+            "Time to store and fan out a delivered message.",
+        )
+        self.fanout_seconds = metrics.histogram(
+            "rxchat_fanout_seconds", "Time to queue a message for all recipients."
+        )
+        self.send_seconds = metrics.histogram(
+            "rxchat_send_seconds", "Time to write one frame to a client socket."
+        )
+        self.dropped_frames = metrics.counter(
+            "rxchat_dropped_frames_total",
+            "Frames dropped by the overflow policy of client queues.",
+        )
+        metrics.gauge(
+            "rxchat_connected_users",
+            "Connected WebSocket users.",
+            lambda: len(self.users),
+        )
+        metrics.gauge(
+            "rxchat_outbound_queue_depth",
+            "Frames waiting in client outbound queues.",
+            lambda: sum(h.stats()["queued"] for h in self.users.values()),
+        )
+        metrics.gauge(
+            "rxchat_conversation_members",
+            "Members per conversation.",
+            lambda: {
+                cid: c.user_count() for cid, c in self.get_conversations().items()
+            },
+            label="conversation",
+        )
+        if self.rate_limiter is not None:
+            self.rate_limiter.outcomes = metrics.counter(
+                "rxchat_rate_limited_messages_total",
+                "Incoming messages by rate limit outcome.",
+                label="outcome",
+            )
+
+    async def start(self) -> None:
+        self._restore_snapshot()
+        if self.store is not None:
+            # Continue the sequence numbers of persisted conversations.
+            self.store_seqs = await self.store.last_seqs()
+            for cid, conversation in self.conversations.items():
+                conversation.seq = max(conversation.seq, self.store_seqs.get(cid, 0))
+        if self.broker is not None:
+            await self.broker.subscribe(
+                self.deliver_message, self.deliver_disconnect, self.deliver_notify
+            )
+        if self.presence is not None:
+            self.presence.start()
+        interval = self.heartbeat_interval or self.idle_timeout
+        if interval is not None:
+            self._reaper = asyncio.create_task(self._reap_loop(interval))
+        if self.snapshot_path is not None and self.snapshot_interval is not None:
+            self._snapshotter = asyncio.create_task(
+                self._snapshot_loop(self.snapshot_interval)
+            )
+
+    async def _reap_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap()
+            except Exception as ex:
+                logger.error(f"Unable to check sessions: {ex!r}")
+
+    async def reap(self) -> list[str]:
+        """Ping every session and evict the dead and idle ones.
+
+        Evicted handlers stop and go through the normal disconnect cleanup.
+        Returns the evicted usernames.
+        """
+        now = time.monotonic()
+        evicted = []
+        for username, handler in list(self.users.items()):
+            if not await handler.heartbeat(now):
+                evicted.append(username)
+        return evicted
+
+    def _restore_snapshot(self) -> None:
+        """Recreate the conversations of the last snapshot, leaving windows cold."""
+        if self.snapshot_path is None:
+            return
+        try:
+            self.snapshot = Snapshot.open(self.snapshot_path)
+        except (ValueError, struct.error, OSError) as ex:
+            bad = f"{self.snapshot_path}.bad"
+            logger.warning(f"Unable to read snapshot, moving it to {bad}: {ex!r}")
+            try:
+                os.replace(self.snapshot_path, bad)
+            except OSError:
+                pass
+            self.snapshot = None
+        if self.snapshot is None:
+            return
+        for cid, entry in self.snapshot.entries.items():
+            conversation = self.conversations.get(cid)
+            if conversation is None:
+                conversation = self.conversations[cid] = Conversation(
+                    id=cid,
+                    title=entry.title,
+                    history_size=self.history_size,
+                    store=self.store,
+                )
+            conversation.seq = max(conversation.seq, entry.seq)
+        self.snapshot_seqs = {cid: e.seq for cid, e in self.snapshot.entries.items()}
+        self.directory_version += 1
+        logger.info(
+            f"Restored {len(self.snapshot.entries)} conversations"
+            f" from {self.snapshot_path}"
+        )
+
+    def _warm(self, conversation: Conversation) -> None:
+        """Decode the snapshot window of a conversation on its first use."""
+        if self.snapshot is None or conversation.id not in self.snapshot.cold:
+            return
+        try:
+            conversation.messages.extend(self.snapshot.take(conversation.id))
+        except Exception as ex:
+            # take() marked the window as used, so the room starts empty.
+            logger.error(f"Unable to restore {conversation.id} from snapshot: {ex!r}")
+        if not self.snapshot.cold:
+            self.snapshot.close()
+            self.snapshot = None
+
+    async def _snapshot_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save_snapshot()
+            except Exception as ex:
+                logger.error(f"Unable to write snapshot: {ex!r}")
+
+    async def save_snapshot(self) -> bool:
+        """Write conversations and windows to ``snapshot_path``.
+
+        Returns False when nothing changed since the last snapshot. Cold
+        windows are copied from the mapped snapshot without decoding them.
+        """
+        if self.snapshot_path is None:
+            return False
+        if self._snapshot_write is not None and not self._snapshot_write.done():
+            await asyncio.shield(self._snapshot_write)
+        seqs = {cid: c.seq for cid, c in self.conversations.items()}
+        if seqs == self.snapshot_seqs:
+            return False
+        snapshot = self.snapshot
+        entries = [
+            (
+                cid,
+                c.title,
+                c.seq,
+                (
+                    snapshot.raw(cid)
+                    if snapshot is not None and cid in snapshot.cold
+                    else pack_window(c)
+                ),
+            )
+            for cid, c in self.conversations.items()
+        ]
+        # A cancelled caller must not leave a half-finished write behind.
+        self._snapshot_write = asyncio.ensure_future(
+            asyncio.to_thread(write_snapshot, self.snapshot_path, entries)
+        )
+        await asyncio.shield(self._snapshot_write)
+        self.snapshot_seqs = seqs
+        return True
 
     def get_users(self) -> dict[str, WebSocketClientHandlerInterface]:
         return self.users
@@ -33,16 +287,99 @@ class ChatServer(ChatServerInterface):
     def get_conversations(self) -> dict[str, Conversation]:
         return self.conversations
 
-    async def handle_user_websocket(self, username: str, ws: WebSocket) -> None:
-        handler: WebSocketClientHandlerInterface = WebSocketClientHandler(ws, username)
+    async def handle_user_websocket(
+        self, username: str, ws: WebSocket, batching: bool = False, binary: bool = False
+    ) -> None:
+        handler: WebSocketClientHandlerInterface = WebSocketClientHandler(
+            ws,
+            username,
+            queue_size=self.queue_size,
+            overflow=self.overflow,
+            batch_window=self.batch_window if batching else None,
+            batch_size=self.batch_size,
+            binary=binary,
+            send_seconds=self.send_seconds,
+            dropped_frames=self.dropped_frames,
+            heartbeat_timeout=self.heartbeat_timeout,
+            idle_timeout=self.idle_timeout,
+        )
         self.users[username] = handler
-        await handler(self)
+        self.direct_users.discard(username)
+        if binary:
+            self.binary_users.add(username)
+        else:
+            self.binary_users.discard(username)
+        try:
+            await handler(self)
+        finally:
+            if username not in self.users:
+                self.binary_users.discard(username)
+
+    def connect_direct(self, username: str) -> DirectClientHandler:
+        handler = DirectClientHandler(
+            username,
+            queue_size=self.queue_size,
+            overflow=self.overflow,
+            idle_timeout=self.idle_timeout,
+            dropped_frames=self.dropped_frames,
+        )
+        self.users[username] = handler
+        self.binary_users.discard(username)
+        self.direct_users.add(username)
+
+        async def serve() -> None:
+            try:
+                await handler(self)
+            finally:
+                if username not in self.users:
+                    self.direct_users.discard(username)
+                await self.handle_user_disconnected(username)
+
+        handler._task = asyncio.create_task(serve())
+        return handler
+
+    def directory(self) -> tuple[str, str]:
+        if self._directory is None or self._directory[0] != self.directory_version:
+            data = json.dumps(
+                [
+                    {"id": c.id, "users_count": c.user_count()}
+                    for c in self.conversations.values()
+                ]
+            )
+            etag = f'"{self.worker_id}-{self.directory_version}"'
+            self._directory = (self.directory_version, data, etag)
+        return self._directory[1], self._directory[2]
+
+    def _add_member(self, username: str, conversation: Conversation) -> None:
+        conversation.usernames.add(username)
+        self.directory_version += 1
+        if username == "_system":
+            # System notices never disconnect, so they need no reverse index.
+            return
+        self.user_conversations.setdefault(username, OrderedSet()).add(conversation.id)
+
+    def _remove_member(self, username: str, conversation: Conversation) -> None:
+        conversation.usernames.discard(username)
+        self.directory_version += 1
+        conversation_ids = self.user_conversations.get(username)
+        if conversation_ids is not None:
+            conversation_ids.discard(conversation.id)
+            if not conversation_ids:
+                del self.user_conversations[username]
 
     async def handle_user_disconnected(self, username: str) -> None:
-        for cid, c in self.conversations.items():
-            if username not in c.usernames:
+        if username in self.users:
+            # The user already reconnected on a new socket.
+            return
+        for cid in self.user_conversations.pop(username, OrderedSet()):
+            c = self.conversations.get(cid)
+            if c is None or username not in c.usernames:
+                continue
+            c.usernames.discard(username)
+            self.directory_version += 1
+            if self.presence is not None:
+                self.presence.left(c, username)
                 continue
-            c.usernames.remove(username)
             await self.send_message(
                 Message(
                     conversation_id=cid,
@@ -50,22 +387,51 @@ class ChatServer(ChatServerInterface):
                     content=f"User {username} disconnected.",
                 )
             )
+        if self.broker is not None:
+            await self.broker.publish_disconnect(self.worker_id, username)
 
-    async def user_join(self, username: str, conversation_id: str) -> None:
+    def _get_or_create_conversation(self, conversation_id: str) -> Conversation:
         if conversation_id not in self.conversations:
             self.conversations[conversation_id] = Conversation(
-                id=conversation_id, title="Unknown"
+                id=conversation_id,
+                title="Unknown",
+                history_size=self.history_size,
+                store=self.store,
+                seq=self.store_seqs.get(conversation_id, 0),
             )
-        conversation: Conversation = self.conversations[conversation_id]
-        if username in conversation.usernames:
-            return
-        conversation.usernames.append(username)
-        await self.notify(
-            username,
-            ResponseJoinConversation(
-                conversation_id=conversation_id, users=conversation.usernames
-            ),
+            self.directory_version += 1
+        conversation = self.conversations[conversation_id]
+        self._warm(conversation)
+        return conversation
+
+    def _join_response(self, conversation: Conversation) -> ResponseJoinConversation:
+        large = self.presence is not None and self.presence.is_large(conversation)
+        return ResponseJoinConversation(
+            conversation_id=conversation.id,
+            users=[] if large else list(conversation.usernames),
+            seq=conversation.seq,
+            users_count=conversation.user_count(),
         )
+
+    async def user_join(
+        self, username: str, conversation_id: str, since: Optional[int] = None
+    ) -> None:
+        conversation: Conversation = self._get_or_create_conversation(conversation_id)
+        joined = username not in conversation.usernames
+        if not joined and since is None:
+            return
+        if joined:
+            self._add_member(username, conversation)
+        await self.notify(username, self._join_response(conversation))
+        if since is not None:
+            # Resuming client: replay what it missed from the in-memory window.
+            for message in conversation.since(since):
+                await self.notify(username, message)
+        if not joined:
+            return
+        if self.presence is not None:
+            self.presence.joined(conversation, username)
+            return
         await self.send_message(
             EventUserJoinConversation(
                 conversation_id=conversation_id,
@@ -73,6 +439,43 @@ class ChatServer(ChatServerInterface):
             )
         )
 
+    async def users_join(self, conversation_id: str, usernames: Iterable[str]) -> None:
+        conversation: Conversation = self._get_or_create_conversation(conversation_id)
+        joining = [u for u in OrderedSet(usernames) if u not in conversation.usernames]
+        for username in joining:
+            self._add_member(username, conversation)
+        response = self._join_response(conversation)
+        for username in joining:
+            await self.notify(username, response)
+        if self.presence is not None:
+            for username in joining:
+                self.presence.joined(conversation, username)
+            return
+        await self.send_messages(
+            [
+                EventUserJoinConversation(conversation_id=conversation_id, username=u)
+                for u in joining
+            ]
+        )
+
+    async def users_leave(self, conversation_id: str, usernames: Iterable[str]) -> None:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            return
+        if self.presence is not None:
+            for username in OrderedSet(usernames):
+                if username in conversation.usernames:
+                    self._remove_member(username, conversation)
+                    self.presence.left(conversation, username)
+            return
+        await self.send_messages(
+            [
+                EventUserLeaveConversation(conversation_id=conversation_id, username=u)
+                for u in OrderedSet(usernames)
+                if u in conversation.usernames
+            ]
+        )
+
     async def user_leave(self, username: str, conversation_id: str) -> None:
         if conversation_id not in self.conversations:
             # raise RuntimeError("Username is not in the conversation")
@@ -80,25 +483,195 @@ class ChatServer(ChatServerInterface):
         conversation: Conversation = self.conversations[conversation_id]
         if username not in conversation.usernames:
             return
+        if self.presence is not None:
+            self._remove_member(username, conversation)
+            self.presence.left(conversation, username)
+            return
         await self.send_message(
             EventUserLeaveConversation(
                 conversation_id=conversation_id, username=username
             )
         )
-        conversation.usernames.remove(username)
+        self._remove_member(username, conversation)
+
+    async def admit(self, username: str, conversation_id: str) -> bool:
+        if self.rate_limiter is None:
+            return True
+        return await self.rate_limiter.acquire(username, conversation_id)
 
     async def send_message(self, message: ServerMessage) -> None:
-        if message.conversation_id not in self.conversations.keys():
+        conversation = self.conversations.get(message.conversation_id)  # type: ignore
+        if conversation is None:
             raise RuntimeError(f"Conversation {message.conversation_id=} not found")
-        conversation: Conversation = self.conversations[message.conversation_id]
-        conversation.add_message(message)
-        tasks: list[asyncio.Task] = [
-            asyncio.create_task(self.notify(username, message))
-            for username in conversation.usernames
+        # Numbered on delivery, or by the broker when there is one.
+        message.seq = None
+        if self.broker is None:
+            await self.deliver_message(self.worker_id, message)
+        else:
+            await self.broker.publish(self.worker_id, message, conversation.seq)
+
+    async def send_messages(self, messages: Iterable[ServerMessage]) -> None:
+        batches: dict[str, list[ServerMessage]] = {}
+        for message in messages:
+            batches.setdefault(message.conversation_id, []).append(message)  # type: ignore[arg-type]
+        missing = [cid for cid in batches if cid not in self.conversations]
+        if missing:
+            raise RuntimeError(f"Conversations {missing} not found")
+        for cid, batch in batches.items():
+            for message in batch:
+                message.seq = None
+            if self.broker is None:
+                await self.deliver_messages(self.worker_id, batch)
+                continue
+            conversation = self.conversations[cid]
+            for message in batch:
+                await self.broker.publish(self.worker_id, message, conversation.seq)
+
+    async def deliver_messages(
+        self, origin: str, messages: list[ServerMessage]
+    ) -> None:
+        """Record messages of one conversation and fan them out in one pass."""
+        start = time.perf_counter() if self.ingest_seconds is not None else 0.0
+        conversation: Conversation = self._get_or_create_conversation(
+            messages[0].conversation_id  # type: ignore[arg-type]
+        )
+        recorded = [
+            message
+            for message in messages
+            if self._record(origin, conversation, message)
         ]
-        await asyncio.gather(*tasks)
+        await self.broadcast_many(conversation.usernames, recorded)
+        for message in recorded:
+            self._members_after(origin, conversation, message)
+        if self.ingest_seconds is not None:
+            self.ingest_seconds.observe(time.perf_counter() - start)
+
+    def _record(
+        self, origin: str, conversation: Conversation, message: ServerMessage
+    ) -> bool:
+        """Add a delivered event to the window; False if it is out of order."""
+        self._members_before(origin, conversation, message)
+        try:
+            conversation.add_message(message, persist=origin == self.worker_id)
+        except ValueError as ex:
+            logger.error(f"Dropping event from {origin}: {ex}")
+            return False
+        return True
+
+    def _members_before(
+        self, origin: str, conversation: Conversation, message: ServerMessage
+    ) -> None:
+        if isinstance(message, EventConversationPresence):
+            # The origin worker changed its members before queueing the diff.
+            if origin != self.worker_id:
+                for username in message.joined:
+                    if username not in conversation.usernames:
+                        self._add_member(username, conversation)
+        elif message.username not in conversation.usernames:
+            self._add_member(message.username, conversation)
+
+    def _members_after(
+        self, origin: str, conversation: Conversation, message: ServerMessage
+    ) -> None:
+        if isinstance(message, EventUserLeaveConversation):
+            self._remove_member(message.username, conversation)
+        elif isinstance(message, EventConversationPresence):
+            if origin != self.worker_id:
+                for username in message.left:
+                    self._remove_member(username, conversation)
+
+    async def deliver_message(self, origin: str, message: ServerMessage) -> None:
+        start = time.perf_counter() if self.ingest_seconds is not None else 0.0
+        conversation: Conversation = self._get_or_create_conversation(
+            message.conversation_id  # type: ignore[arg-type]
+        )
+        if not self._record(origin, conversation, message):
+            return
+        await self.broadcast(conversation.usernames, message)
+        self._members_after(origin, conversation, message)
+        if self.ingest_seconds is not None:
+            self.ingest_seconds.observe(time.perf_counter() - start)
+
+    async def deliver_disconnect(self, origin: str, username: str) -> None:
+        for cid in self.user_conversations.pop(username, OrderedSet()):
+            if cid in self.conversations:
+                self.conversations[cid].usernames.discard(username)
+                self.directory_version += 1
+
+    async def deliver_notify(
+        self, origin: str, username: str, message: ServerMessage
+    ) -> None:
+        """Send an event for one user if their socket is on this worker."""
+        handler = self.users.get(username)
+        if handler is not None:
+            await handler.send(message)
+
+    async def broadcast(self, usernames: Iterable[str], message: ServerMessage) -> None:
+        start = time.perf_counter() if self.fanout_seconds is not None else 0.0
+        data: Optional[str] = None
+        packed: Optional[bytes] = None
+        binary_users = self.binary_users
+        direct_users = self.direct_users
+        for username in usernames:
+            handler = self.users.get(username)
+            if handler is None:
+                logger.debug(
+                    f"Unable to notify {username} message={message} as it is not in users"
+                )
+                continue
+            if binary_users and username in binary_users:
+                if packed is None:
+                    packed = pack_event(message)
+                await handler.send_bytes(packed)
+                continue
+            if direct_users and username in direct_users:
+                await handler.send(message)
+                continue
+            if data is None:
+                data = message.json()
+            await handler.send_text(data)
+        if self.fanout_seconds is not None:
+            self.fanout_seconds.observe(time.perf_counter() - start)
+
+    async def broadcast_many(
+        self, usernames: Iterable[str], messages: list[ServerMessage]
+    ) -> None:
+        """Send messages to each connected user, visiting every user once.
+
+        JSON and binary frames are encoded on first use. In-process users get
+        the messages themselves.
+        """
+        start = time.perf_counter() if self.fanout_seconds is not None else 0.0
+        frames: Optional[list[str]] = None
+        packed: Optional[list[bytes]] = None
+        binary_users = self.binary_users
+        direct_users = self.direct_users
+        for username in usernames:
+            handler = self.users.get(username)
+            if handler is None:
+                continue
+            if binary_users and username in binary_users:
+                if packed is None:
+                    packed = [pack_event(message) for message in messages]
+                for frame in packed:
+                    await handler.send_bytes(frame)
+                continue
+            if direct_users and username in direct_users:
+                for message in messages:
+                    await handler.send(message)
+                continue
+            if frames is None:
+                frames = [message.json() for message in messages]
+            for data in frames:
+                await handler.send_text(data)
+        if self.fanout_seconds is not None:
+            self.fanout_seconds.observe(time.perf_counter() - start)
 
     async def notify(self, username: str, message: ServerMessage) -> None:
+        if username not in self.users and self.broker is not None:
+            # The user may be connected to another worker.
+            await self.broker.publish_notify(self.worker_id, username, message)
+            return
         if username not in self.users:
             logger.warning(
                 f"Unable to notify {username} message={message} as it is not in users"
@@ -109,23 +682,63 @@ class ChatServer(ChatServerInterface):
     def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
         if conversation_id not in self.conversations:
             return None
-        return self.conversations[conversation_id]
+        conversation = self.conversations[conversation_id]
+        self._warm(conversation)
+        return conversation
+
+    async def page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> Optional[list[ServerMessage]]:
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            return None
+        return await conversation.page(limit, before=before, after=after)
+
+    def slow_consumers(self) -> dict[str, dict[str, int]]:
+        stats = {u: handler.stats() for u, handler in self.users.items()}
+        return {u: s for u, s in stats.items() if s["overflows"]}
+
+    def memory_usage(self) -> int:
+        return sum(c.memory_usage() for c in self.conversations.values())
 
     async def close(self, notify=False, content="Server is shutting down", timeout=2):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        if self._snapshotter is not None:
+            self._snapshotter.cancel()
+            self._snapshotter = None
+        if self.presence is not None:
+            await self.presence.close()
 
         if notify:
             logger.info("Notifying server stopping...")
             message = Message(
                 username="_system", conversation_id="_system", content=content
             )
-            tasks = [
-                asyncio.create_task(user_handler.send(message))
-                for user_handler in self.users.values()
-            ]
-            await asyncio.gather(*tasks)
-            await asyncio.sleep(timeout)
+            await self.broadcast(list(self.users.keys()), message)
+
+        async def finish(username: str, handler: WebSocketClientHandlerInterface):
+            try:
+                async with asyncio.timeout(timeout):
+                    await handler.drain()
+            except TimeoutError:
+                logger.warning(f" - {username} not drained after {timeout}s")
+            await handler.close()
 
-        t = []
-        for user_handler in self.users.values():
-            t.append(asyncio.create_task(user_handler.close()))
-        await asyncio.gather(*t)
+        await asyncio.gather(*(finish(u, h) for u, h in list(self.users.items())))
+        try:
+            await self.save_snapshot()
+        except Exception as ex:
+            logger.error(f"Unable to write snapshot: {ex!r}")
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+        if self.broker is not None:
+            await self.broker.close()
+        if self.store is not None:
+            await self.store.close()
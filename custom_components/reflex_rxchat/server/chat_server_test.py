@@ -1,3 +1,5 @@
+import json
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from reflex_rxchat.server.chat_server import ChatServer
@@ -10,6 +12,9 @@ from reflex_rxchat.server.events import (
 from .interfaces import ChatServerInterface
 from reflex_rxchat.server.websocket_handler import WebSocketClientHandler
 from reflex_rxchat.server import Conversation
+from reflex_rxchat.server.models import OrderedSet
+from reflex_rxchat.server.metrics import MetricsRegistry
+from reflex_rxchat.server.wire import AVAILABLE, pack_event
 
 
 @pytest.fixture
@@ -36,7 +41,7 @@ async def test_handle_user_websocket(chat_server: ChatServerInterface, mock_webs
     username = "test_user"
     ws = AsyncMock()
     ws.accept = AsyncMock()
-    ws.receive_json.side_effect = []
+    ws.receive_text.side_effect = []
     await chat_server.handle_user_websocket(username, ws)
     ws.accept.assert_awaited_once()
 
@@ -49,8 +54,9 @@ async def test_handle_user_disconnected(chat_server):
 
     # Setup mock conversation
     conversation = AsyncMock(spec=Conversation)
-    conversation.usernames = [username]
+    conversation.usernames = OrderedSet([username])
     chat_server.conversations = {conversation_id: conversation}
+    chat_server.user_conversations = {username: OrderedSet([conversation_id])}
 
     # Mock send_message
     chat_server.send_message = AsyncMock()
@@ -96,7 +102,9 @@ async def test_user_join(chat_server):
 
     chat_server.notify.assert_called_with(
         username,
-        ResponseJoinConversation(conversation_id=conversation_id, users=[username]),
+        ResponseJoinConversation(
+            conversation_id=conversation_id, users=[username], seq=0, users_count=1
+        ),
     )
 
     chat_server.send_message.assert_called_with(
@@ -115,12 +123,12 @@ async def test_user_leave(chat_server):
     username = "test_user"
     user_handler = AsyncMock(spec=WebSocketClientHandler)
     user_handler.username = username
-    conversation.usernames.append(username)
+    conversation.usernames.add(username)
 
     other_user = "other_user"
     other_user_handler = AsyncMock(spec=WebSocketClientHandler)
     other_user_handler.username = other_user
-    conversation.usernames.append(other_user)
+    conversation.usernames.add(other_user)
 
     chat_server.conversations = {conversation_id: conversation}
 
@@ -172,13 +180,33 @@ async def test_send_message_successful(chat_server):
     handler = AsyncMock(spec=WebSocketClientHandler)
     chat_server.users = {username: handler}
 
-    # Mock notify
-    chat_server.notify = AsyncMock()
+    await chat_server.send_message(message)
+
+    # Verify that every user in the conversation received the encoded message
+    handler.send_text.assert_awaited_once_with(message.json())
+
+
+@pytest.mark.asyncio
+async def test_send_message_serializes_once(chat_server):
+    """Test the message is encoded once and the same frame is sent to everyone."""
+    conversation_id = "test_conversation"
+    usernames = ["alice", "bob", "carol"]
+
+    conversation = Conversation(id=conversation_id, title="")
+    conversation.usernames = list(usernames)
+    chat_server.conversations = {conversation_id: conversation}
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in usernames}
+
+    message = MagicMock(spec=Message)
+    message.conversation_id = conversation_id
+    message.username = "alice"
+    message.json.return_value = '{"content": "hi"}'
 
     await chat_server.send_message(message)
 
-    # Verify that notify was called for each user in the conversation
-    chat_server.notify.assert_awaited_once_with(username, message)
+    message.json.assert_called_once()
+    for handler in chat_server.users.values():
+        handler.send_text.assert_awaited_once_with('{"content": "hi"}')
 
 
 @pytest.mark.asyncio
@@ -194,3 +222,238 @@ async def test_notify_does_not_send_message_if_user_not_found(chat_server):
 
     # Assert that send was not called
     chat_server.users.get(username, MagicMock()).send.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_user_conversations_reverse_index(chat_server):
+    """Test joins and leaves keep the user -> conversations index in sync."""
+    chat_server.notify = AsyncMock()
+    chat_server.send_message = AsyncMock()
+
+    await chat_server.user_join("alice", "Tech")
+    await chat_server.user_join("alice", "Jokes")
+    assert list(chat_server.user_conversations["alice"]) == ["Tech", "Jokes"]
+
+    await chat_server.user_leave("alice", "Tech")
+    assert list(chat_server.user_conversations["alice"]) == ["Jokes"]
+
+    await chat_server.handle_user_disconnected("alice")
+    assert "alice" not in chat_server.user_conversations
+    assert "alice" not in chat_server.conversations["Jokes"].usernames
+
+
+@pytest.mark.asyncio
+async def test_system_notices_do_not_count_as_members(chat_server):
+    """Test a disconnect notice leaves _system out of counts and the index."""
+    chat_server.notify = AsyncMock()
+    await chat_server.user_join("alice", "Tech")
+    await chat_server.user_join("bob", "Tech")
+    await chat_server.handle_user_disconnected("bob")
+    assert "_system" in chat_server.conversations["Tech"].usernames
+
+    await chat_server.user_join("carol", "Tech")
+
+    response = chat_server.notify.await_args_list[-1].args[1]
+    assert response.users_count == 2
+    assert "_system" not in chat_server.user_conversations
+
+
+@pytest.mark.asyncio
+async def test_metrics_record_delivery():
+    """Test delivering a message updates the ingest and fan-out histograms."""
+    metrics = MetricsRegistry()
+    chat_server = ChatServer(metrics=metrics)
+    chat_server.users = {"alice": AsyncMock(spec=WebSocketClientHandler)}
+    chat_server.users["alice"].stats.return_value = {"queued": 2, "dropped": 0}
+    chat_server.conversations["Tech"].usernames.add("alice")
+
+    await chat_server.send_message(
+        Message(conversation_id="Tech", username="alice", content="hi")
+    )
+
+    assert chat_server.ingest_seconds.count == 1
+    assert chat_server.fanout_seconds.count == 1
+    text = metrics.render()
+    assert "rxchat_connected_users 1" in text
+    assert "rxchat_outbound_queue_depth 2" in text
+    assert 'rxchat_conversation_members{conversation="Tech"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_send_messages_fans_out_once_per_conversation(chat_server):
+    """Test a bulk send visits each member once and keeps message order."""
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in "ab"}
+    chat_server.broadcast_many = AsyncMock(wraps=chat_server.broadcast_many)
+    messages = [
+        Message(conversation_id=cid, username="a", content=str(i))
+        for i, cid in enumerate(["Tech", "Jokes", "Tech"])
+    ]
+    chat_server.conversations["Tech"].usernames.add("b")
+
+    await chat_server.send_messages(messages)
+
+    assert chat_server.broadcast_many.await_count == 2
+    frames = [c.args[0] for c in chat_server.users["b"].send_text.await_args_list]
+    assert frames == [messages[0].json(), messages[2].json()]
+    assert [m.content for m in chat_server.conversations["Tech"].messages] == [
+        "0",
+        "2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_send_messages_rejects_unknown_conversations(chat_server):
+    """Test nothing is delivered when a conversation of the batch is missing."""
+    chat_server.deliver_messages = AsyncMock()
+    with pytest.raises(RuntimeError):
+        await chat_server.send_messages(
+            [
+                Message(conversation_id="Tech", username="a", content="x"),
+                Message(conversation_id="missing", username="a", content="x"),
+            ]
+        )
+    chat_server.deliver_messages.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_users_join_and_leave(chat_server):
+    """Test bulk joins notify each new member and bulk leaves remove them."""
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in "abc"}
+    await chat_server.user_join("a", "Tech")
+
+    await chat_server.users_join("Tech", ["a", "b", "c", "b"])
+
+    assert list(chat_server.conversations["Tech"].usernames) == ["a", "b", "c"]
+    chat_server.users["b"].send.assert_awaited_once_with(
+        ResponseJoinConversation(
+            conversation_id="Tech", users=["a", "b", "c"], seq=1, users_count=3
+        )
+    )
+    events = list(chat_server.conversations["Tech"].messages)
+    assert [e.username for e in events] == ["a", "b", "c"]
+
+    await chat_server.users_leave("Tech", ["a", "c", "missing"])
+    assert list(chat_server.conversations["Tech"].usernames) == ["b"]
+    assert list(chat_server.user_conversations) == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_directory_is_rebuilt_only_after_changes(chat_server):
+    """Test the serialized directory and ETag change only with membership."""
+    chat_server.notify = AsyncMock()
+    data, etag = chat_server.directory()
+    assert chat_server.directory() == (data, etag)
+
+    await chat_server.user_join("alice", "Tech")
+    changed, new_etag = chat_server.directory()
+    assert new_etag != etag
+    assert {"id": "Tech", "users_count": 1} in json.loads(changed)
+
+    await chat_server.user_leave("alice", "Tech")
+    assert chat_server.directory()[0] == data
+
+
+@pytest.mark.skipif(not AVAILABLE, reason="msgpack is not installed")
+@pytest.mark.asyncio
+async def test_broadcast_packs_once_for_binary_users(chat_server):
+    """Test binary users get the packed frame while JSON users get text."""
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in "abc"}
+    chat_server.binary_users = {"b", "c"}
+    message = Message(conversation_id="Tech", username="a", content="hi")
+
+    await chat_server.broadcast(["a", "b", "c"], message)
+
+    chat_server.users["a"].send_text.assert_awaited_once_with(message.json())
+    packed = pack_event(message)
+    for u in "bc":
+        chat_server.users[u].send_bytes.assert_awaited_once_with(packed)
+        chat_server.users[u].send_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_user_join_since_replays_missed_events(chat_server):
+    """Test a resuming member gets only the events after its last seq."""
+    handler = AsyncMock(spec=WebSocketClientHandler)
+    chat_server.users = {"alice": handler, "bob": AsyncMock()}
+    await chat_server.user_join("alice", "Tech")
+    await chat_server.user_join("bob", "Tech")
+    for content in ("one", "two", "three"):
+        await chat_server.send_message(
+            Message(conversation_id="Tech", username="bob", content=content)
+        )
+    handler.send.reset_mock()
+
+    await chat_server.user_join("alice", "Tech", since=3)
+
+    sent = [c.args[0] for c in handler.send.await_args_list]
+    assert sent[0] == ResponseJoinConversation(
+        conversation_id="Tech", users=["alice", "bob"], seq=5, users_count=2
+    )
+    assert [m.content for m in sent[1:]] == ["two", "three"]
+    assert [m.seq for m in sent[1:]] == [4, 5]
+    assert len(chat_server.conversations["Tech"].messages) == 5
+
+
+@pytest.mark.asyncio
+async def test_presence_coalesces_joins_and_leaves():
+    """Test joins and leaves become one presence diff per conversation."""
+    chat_server = ChatServer(presence_interval=60)
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in "abc"}
+    await chat_server.users_join("Tech", ["a", "b"])
+    await chat_server.user_join("c", "Tech")
+    await chat_server.user_leave("b", "Tech")
+
+    assert list(chat_server.conversations["Tech"].usernames) == ["a", "c"]
+    assert not chat_server.conversations["Tech"].messages
+    await chat_server.presence.flush()
+
+    (event,) = chat_server.conversations["Tech"].messages
+    assert (event.joined, event.left, event.users_count) == (["a", "c"], [], 2)
+    chat_server.users["a"].send_text.assert_awaited_once_with(event.json())
+    chat_server.users["b"].send_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_presence_large_room_skips_member_list():
+    """Test large rooms get only the member count on join."""
+    chat_server = ChatServer(presence_interval=60, large_room_size=2)
+    chat_server.users = {u: AsyncMock(spec=WebSocketClientHandler) for u in "abc"}
+    await chat_server.users_join("Tech", ["a", "b"])
+    await chat_server.user_join("c", "Tech")
+
+    chat_server.users["c"].send.assert_awaited_once_with(
+        ResponseJoinConversation(conversation_id="Tech", users=[], seq=0, users_count=3)
+    )
+    await chat_server.presence.flush()
+    assert not chat_server.conversations["Tech"].messages
+
+
+@pytest.mark.asyncio
+async def test_reap_evicts_dead_sessions():
+    """Test the reaper evicts handlers whose heartbeat fails."""
+    chat_server = ChatServer(heartbeat_interval=5)
+    alive = AsyncMock(spec=WebSocketClientHandler)
+    alive.heartbeat.return_value = True
+    dead = AsyncMock(spec=WebSocketClientHandler)
+    dead.heartbeat.return_value = False
+    chat_server.users = {"alive": alive, "dead": dead}
+
+    assert await chat_server.reap() == ["dead"]
+    assert chat_server.heartbeat_timeout == 10
+    alive.heartbeat.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_each_handler_before_closing():
+    """Test close waits for each queue to drain, up to the timeout."""
+    chat_server = ChatServer()
+    drained = AsyncMock(spec=WebSocketClientHandler)
+    stuck = AsyncMock(spec=WebSocketClientHandler)
+    stuck.drain.side_effect = asyncio.Event().wait
+    chat_server.users = {"drained": drained, "stuck": stuck}
+
+    await asyncio.wait_for(chat_server.close(notify=True, timeout=0.05), 1)
+    for handler in (drained, stuck):
+        handler.send_text.assert_awaited_once()
+        handler.drain.assert_awaited_once()
+        handler.close.assert_awaited_once()
@@ -0,0 +1,147 @@
+"""Fast decoding of chat events.
+
+Each event model gets a decoder compiled once from its pydantic fields. It
+checks and coerces the few field types the events use and builds the model
+with ``construct()``, skipping the generic pydantic validation. ``orjson`` is
+used for JSON parsing when it is installed.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Union
+
+import reflex as rx
+from pydantic.v1.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+
+from .events import (
+    EventType,
+    ClientMessage,
+    ServerMessage,
+    Message,
+    RequestJoinConversation,
+    RequestLeaveConversation,
+    ResponseJoinConversation,
+    EventUserJoinConversation,
+    EventUserLeaveConversation,
+    EventConversationPresence,
+    Ping,
+    Pong,
+)
+
+try:
+    import orjson
+
+    loads: Callable[[Union[str, bytes]], Any] = orjson.loads
+except ImportError:  # pragma: no cover - depends on the environment
+    loads = json.loads
+
+Decoder = Callable[[dict], Any]
+
+
+def _coerce_str(value: Any) -> str:
+    if type(value) is str:
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(f"str expected, got {value!r}")
+
+
+def _coerce_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    raise ValueError(f"datetime expected, got {value!r}")
+
+
+def _coerce_int(value: Any) -> int:
+    if type(value) is int:
+        return value
+    raise ValueError(f"int expected, got {value!r}")
+
+
+_COERCERS: dict[type, Callable[[Any], Any]] = {
+    str: _coerce_str,
+    datetime: _coerce_datetime,
+    int: _coerce_int,
+}
+
+
+def _field_coercer(field: ModelField) -> Optional[Callable[[Any], Any]]:
+    coerce = _COERCERS.get(field.type_)
+    if coerce is None:
+        return None
+    if field.shape == SHAPE_LIST:
+        item = coerce
+
+        def coerce(value: Any) -> list:
+            if not isinstance(value, list):
+                raise ValueError(f"list expected, got {value!r}")
+            return [item(v) for v in value]
+
+    elif field.shape != SHAPE_SINGLETON:
+        return None
+    if field.allow_none:
+        inner = coerce
+        return lambda value: None if value is None else inner(value)
+    return coerce
+
+
+def compile_decoder(model: type[rx.Model]) -> Decoder:
+    """Build a decoder for ``model``; falls back to validation for unknown types."""
+    event = model.__fields__["event"].default
+    fields = []
+    for name, field in model.__fields__.items():
+        if name == "event":
+            continue
+        coerce = _field_coercer(field)
+        if coerce is None:
+            return model.parse_obj
+        fields.append((name, field, coerce))
+
+    def decode(data: dict) -> Any:
+        values: dict[str, Any] = {"event": event}
+        for name, field, coerce in fields:
+            if name in data:
+                values[name] = coerce(data[name])
+            elif field.required:
+                raise ValueError(f"{model.__name__}.{name} is required")
+            else:
+                # A copy, so decoded events never share a mutable default.
+                values[name] = field.get_default()
+        return model.construct(**values)
+
+    return decode
+
+
+CLIENT_DECODERS: dict[str, Decoder] = {
+    EventType.CONVERSATION_MESSAGE: compile_decoder(Message),
+    EventType.REQUEST_CONVERSATION_JOIN: compile_decoder(RequestJoinConversation),
+    EventType.REQUEST_CONVERSATION_LEAVE: compile_decoder(RequestLeaveConversation),
+    EventType.PONG: compile_decoder(Pong),
+}
+
+SERVER_DECODERS: dict[str, Decoder] = {
+    EventType.CONVERSATION_MESSAGE: CLIENT_DECODERS[EventType.CONVERSATION_MESSAGE],
+    EventType.RESPONSE_CONVERSATION_JOIN: compile_decoder(ResponseJoinConversation),
+    EventType.EVENT_CONVERSATION_JOIN: compile_decoder(EventUserJoinConversation),
+    EventType.EVENT_CONVERSATION_LEAVE: compile_decoder(EventUserLeaveConversation),
+    EventType.EVENT_CONVERSATION_PRESENCE: compile_decoder(EventConversationPresence),
+    EventType.PING: compile_decoder(Ping),
+}
+
+
+def decode_client_message(data: dict) -> ClientMessage:
+    decoder = CLIENT_DECODERS.get(data.get("event"))  # type: ignore[arg-type]
+    if decoder is None:
+        raise RuntimeError(f"Server received unknown message. payload={data}")
+    return decoder(data)
+
+
+def decode_server_message(data: dict) -> ServerMessage:
+    decoder = SERVER_DECODERS.get(data.get("event"))  # type: ignore[arg-type]
+    if decoder is None:
+        raise RuntimeError(f"Server received unknown message. payload={data}")
+    return decoder(data)
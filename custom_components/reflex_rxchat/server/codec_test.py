@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime
+
+from reflex_rxchat.server.codec import (
+    decode_client_message,
+    decode_server_message,
+    loads,
+)
+from reflex_rxchat.server.events import (
+    EventType,
+    Message,
+    RequestJoinConversation,
+    ResponseJoinConversation,
+)
+
+
+def test_decode_matches_validated_model():
+    message = Message(conversation_id="c", username="alice", content="hello")
+    decoded = decode_server_message(loads(message.json()))
+
+    assert isinstance(decoded, Message)
+    assert decoded == message
+    assert decoded.json() == message.json()
+
+
+def test_decode_coerces_like_pydantic():
+    decoded = decode_client_message(
+        {
+            "event": EventType.CONVERSATION_MESSAGE,
+            "conversation_id": 123,
+            "username": "alice",
+            "content": "hi",
+            "timestamp": "2024-01-02T03:04:05",
+        }
+    )
+    assert decoded.conversation_id == "123"
+    assert decoded.timestamp == datetime(2024, 1, 2, 3, 4, 5)
+
+    request = decode_client_message(
+        {"event": EventType.REQUEST_CONVERSATION_JOIN, "conversation_id": "Tech"}
+    )
+    assert request == RequestJoinConversation(conversation_id="Tech")
+
+
+def test_decode_list_fields():
+    response = decode_server_message(
+        {
+            "event": EventType.RESPONSE_CONVERSATION_JOIN,
+            "conversation_id": "Tech",
+            "users": ["alice", "bob"],
+        }
+    )
+    assert response == ResponseJoinConversation(
+        conversation_id="Tech", users=["alice", "bob"]
+    )
+
+
+def test_decode_copies_mutable_defaults():
+    data = {"event": EventType.EVENT_CONVERSATION_PRESENCE, "conversation_id": "c"}
+    first = decode_server_message(data)
+    second = decode_server_message(data)
+    first.joined.append("alice")
+    assert second.joined == []
+
+
+def test_decode_rejects_invalid_payloads():
+    with pytest.raises(ValueError):
+        decode_client_message({"event": EventType.CONVERSATION_MESSAGE})
+    with pytest.raises(ValueError):
+        decode_server_message(
+            {
+                "event": EventType.RESPONSE_CONVERSATION_JOIN,
+                "conversation_id": "Tech",
+                "users": "alice",
+            }
+        )
+    with pytest.raises(RuntimeError, match="unknown message"):
+        decode_client_message({"event": EventType.EVENT_CONVERSATION_JOIN})
@@ -0,0 +1,101 @@
+"""In-process transport for clients running next to the ChatServer.
+
+When the Reflex backend also serves the chat router, its states can talk to
+the ChatServer without a loopback WebSocket. ``DirectClientHandler`` takes the
+place of the socket handler: client events arrive on ``inbound`` and server
+events are put on ``outbound`` as model objects, so nothing is encoded or
+decoded on the way. The outbound queue keeps the size and overflow policy of
+socket clients. Events are shared with the server's history and must be
+treated as read-only.
+"""
+
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from . import logger
+from .codec import decode_server_message, loads
+from .events import ClientMessage, ServerMessage
+from .interfaces import ChatServerInterface
+from .metrics import Counter
+from .websocket_handler import (
+    DEFAULT_QUEUE_SIZE,
+    OverflowPolicy,
+    WebSocketClientHandler,
+)
+from .wire import unpack_server_events
+
+
+class DirectClientHandler(WebSocketClientHandler):
+    def __init__(
+        self,
+        username: str,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        idle_timeout: Optional[float] = None,
+        dropped_frames: Optional[Counter] = None,
+    ) -> None:
+        super().__init__(
+            None,  # type: ignore[arg-type]
+            username,
+            queue_size=queue_size,
+            overflow=overflow,
+            idle_timeout=idle_timeout,
+            dropped_frames=dropped_frames,
+        )
+        self.inbound: asyncio.Queue[Optional[ClientMessage]] = asyncio.Queue()
+        self.closed: bool = False
+
+    def is_connected(self) -> bool:
+        return not self.closed and not self.evicted
+
+    async def __call__(self, chat_state: ChatServerInterface) -> None:
+        logger.info(f" - {self.username} connected in-process")
+        self._task = asyncio.current_task()
+        try:
+            async for message in self.receive():
+                await self.dispatch(chat_state, message)  # type: ignore[arg-type]
+        except asyncio.CancelledError:
+            pass
+        finally:
+            logger.info(f" - {self.username} disconnected")
+            users = chat_state.get_users()
+            if users.get(self.username) is self:
+                del users[self.username]
+            await self.close()
+
+    async def receive(self) -> AsyncGenerator[ServerMessage, None]:  # type: ignore
+        while True:
+            message = await self.inbound.get()
+            if message is None:
+                return
+            yield message  # type: ignore[misc]
+
+    async def send(self, message: ServerMessage) -> None:
+        if not self.closed:
+            await self._queue(message)  # type: ignore[arg-type]
+
+    async def send_text(self, data: str) -> None:
+        await self.send(decode_server_message(loads(data)))
+
+    async def send_bytes(self, data: bytes) -> None:
+        for message in unpack_server_events(data):
+            await self.send(message)
+
+    async def drain(self) -> None:
+        if not self.closed:
+            await self.outbound.join()
+
+    async def stop(self) -> None:
+        """End the session from the client side and wait for the server cleanup."""
+        self.inbound.put_nowait(None)
+        if self._task is not None:
+            await self._task
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.outbound.full():
+            self.outbound.get_nowait()
+        # Ends the client's receive loop.
+        self.outbound.put_nowait(None)  # type: ignore[arg-type]
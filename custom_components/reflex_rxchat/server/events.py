@@ -1,4 +1,4 @@
-from typing import Literal, Union
+from typing import Literal, Optional, Union
 
 import reflex as rx
 
@@ -12,6 +12,9 @@ class EventType(StrEnum):
     REQUEST_CONVERSATION_LEAVE = "request.conversation.leave"
     EVENT_CONVERSATION_JOIN = "event.conversation.join"
     EVENT_CONVERSATION_LEAVE = "event.conversation.leave"
+    EVENT_CONVERSATION_PRESENCE = "event.conversation.presence"
+    PING = "ping"
+    PONG = "pong"
     CONVERSATION_MESSAGE = "conversation.message"
 
 
@@ -19,11 +22,14 @@ class ResponseJoinConversation(rx.Model):
     event: Literal[EventType.RESPONSE_CONVERSATION_JOIN] = EventType.RESPONSE_CONVERSATION_JOIN
     conversation_id: str
     users: list[str]
+    seq: Optional[int] = None
+    users_count: Optional[int] = None
 
 
 class RequestJoinConversation(rx.Model):
     event: Literal[EventType.REQUEST_CONVERSATION_JOIN] = EventType.REQUEST_CONVERSATION_JOIN
     conversation_id: str
+    since: Optional[int] = None
 
 
 class RequestLeaveConversation(rx.Model):
@@ -35,12 +41,23 @@ class EventUserJoinConversation(rx.Model):
     event: Literal[EventType.EVENT_CONVERSATION_JOIN] = EventType.EVENT_CONVERSATION_JOIN
     username: str
     conversation_id: str
+    seq: Optional[int] = None
 
 
 class EventUserLeaveConversation(rx.Model):
     event: Literal[EventType.EVENT_CONVERSATION_LEAVE] = EventType.EVENT_CONVERSATION_LEAVE
     username: str
     conversation_id: str
+    seq: Optional[int] = None
+
+
+class EventConversationPresence(rx.Model):
+    event: Literal[EventType.EVENT_CONVERSATION_PRESENCE] = EventType.EVENT_CONVERSATION_PRESENCE
+    conversation_id: str
+    joined: list[str] = []
+    left: list[str] = []
+    users_count: int = 0
+    seq: Optional[int] = None
 
 
 class Message(rx.Model):
@@ -49,13 +66,24 @@ class Message(rx.Model):
     conversation_id: str | None = None
     username: str
     content: str
+    seq: Optional[int] = None
+
+
+class Ping(rx.Model):
+    event: Literal[EventType.PING] = EventType.PING
+
+
+class Pong(rx.Model):
+    event: Literal[EventType.PONG] = EventType.PONG
 
 
-ClientMessage = Union[RequestJoinConversation, RequestLeaveConversation, Message]
+ClientMessage = Union[RequestJoinConversation, RequestLeaveConversation, Message, Pong]
 
 ServerMessage = Union[
     Message,
     EventUserJoinConversation,
     EventUserLeaveConversation,
+    EventConversationPresence,
     ResponseJoinConversation,
+    Ping,
 ]
@@ -0,0 +1,69 @@
+import sys
+from collections import deque
+from itertools import islice
+from typing import Iterable, Optional
+
+from .events import Message
+
+DEFAULT_HISTORY_SIZE: int = 1000
+
+
+def message_size(message: Message) -> int:
+    """Approximate number of bytes retained by a message and its fields."""
+    return sys.getsizeof(message) + sum(
+        sys.getsizeof(value) for value in message.__dict__.values()
+    )
+
+
+class MessageHistory(deque):
+    """Bounded ring buffer holding the most recent messages of a conversation.
+
+    Appending is O(1); once ``capacity`` is reached the oldest message is
+    evicted. ``capacity=None`` keeps an unbounded history.
+    """
+
+    def __init__(
+        self,
+        messages: Iterable[Message] = (),
+        capacity: Optional[int] = DEFAULT_HISTORY_SIZE,
+    ) -> None:
+        super().__init__((), capacity)
+        self.nbytes: int = 0
+        self.extend(messages)
+
+    @property
+    def capacity(self) -> Optional[int]:
+        return self.maxlen
+
+    def append(self, message: Message) -> None:
+        if self.maxlen == 0:
+            return
+        if self.maxlen is not None and len(self) == self.maxlen:
+            self.nbytes -= message_size(self[0])
+        super().append(message)
+        self.nbytes += message_size(message)
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def popleft(self) -> Message:
+        message: Message = super().popleft()
+        self.nbytes -= message_size(message)
+        return message
+
+    def clear(self) -> None:
+        super().clear()
+        self.nbytes = 0
+
+    def tail(self, num_messages: int) -> list[Message]:
+        """Return the newest ``num_messages`` messages, oldest first."""
+        if num_messages <= 0:
+            return []
+        newest = list(islice(reversed(self), num_messages))
+        newest.reverse()
+        return newest
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the buffered messages."""
+        return self.nbytes
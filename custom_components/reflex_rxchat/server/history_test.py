@@ -0,0 +1,67 @@
+import json
+import pytest
+from reflex_rxchat.server.events import Message
+from reflex_rxchat.server.history import MessageHistory, message_size
+from reflex_rxchat.server.models import Conversation
+
+
+def make_messages(count: int) -> list[Message]:
+    return [
+        Message(conversation_id="c", username="alice", content=f"m{i}")
+        for i in range(count)
+    ]
+
+
+def test_history_evicts_oldest_when_full():
+    history = MessageHistory(make_messages(5), capacity=3)
+    assert [m.content for m in history] == ["m2", "m3", "m4"]
+    assert history.capacity == 3
+
+
+def test_history_tail_returns_newest_in_order():
+    history = MessageHistory(make_messages(5), capacity=10)
+    assert [m.content for m in history.tail(2)] == ["m3", "m4"]
+    assert len(history.tail(50)) == 5
+    assert history.tail(0) == []
+
+
+def test_history_memory_usage_tracks_evictions():
+    messages = make_messages(4)
+    history = MessageHistory(messages, capacity=2)
+    assert history.memory_usage() == sum(message_size(m) for m in messages[2:])
+    history.popleft()
+    assert history.memory_usage() == message_size(messages[3])
+    history.clear()
+    assert history.memory_usage() == 0
+
+
+def test_conversation_tail_returns_latest_messages():
+    conversation = Conversation(id="c", title="c", history_size=3)
+    for message in make_messages(5):
+        conversation.add_message(message)
+    tail = conversation.tail(2)
+    assert [m.content for m in tail.messages] == ["m3", "m4"]
+    assert len(conversation.messages) == 3
+
+
+def test_conversation_serializes_messages_as_list():
+    conversation = Conversation(id="c", title="c", history_size=3)
+    for message in make_messages(2):
+        conversation.add_message(message)
+
+    data = conversation.dict()
+    assert [m["content"] for m in data["messages"]] == ["m0", "m1"]
+    assert "store" not in data
+    assert [m["seq"] for m in json.loads(conversation.json())["messages"]] == [1, 2]
+
+
+def test_conversation_rejects_stale_seqs():
+    conversation = Conversation(id="c", title="c")
+    first, second, third = make_messages(3)
+    first.seq = 5
+    conversation.add_message(first)
+    second.seq = 5
+    with pytest.raises(ValueError):
+        conversation.add_message(second)
+    conversation.add_message(third)
+    assert [m.seq for m in conversation.messages] == [5, 6]
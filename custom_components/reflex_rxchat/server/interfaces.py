@@ -1,7 +1,7 @@
-from typing import Optional, Dict, AsyncGenerator
+from typing import Optional, Dict, AsyncGenerator, Iterable, List, Set, Tuple
 from abc import ABC, abstractmethod
 from .events import ServerMessage
-from .models import Conversation
+from .models import Conversation, OrderedSet
 from fastapi import WebSocket
 
 
@@ -23,6 +23,26 @@ class WebSocketClientHandlerInterface(ABC):
     async def send(self, message: ServerMessage) -> None:
         pass
 
+    @abstractmethod
+    async def send_text(self, data: str) -> None:
+        pass
+
+    @abstractmethod
+    async def send_bytes(self, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        pass
+
+    @abstractmethod
+    async def heartbeat(self, now: float) -> bool:
+        pass
+
+    @abstractmethod
+    async def drain(self) -> None:
+        pass
+
     @abstractmethod
     async def close(self):
         pass
@@ -31,6 +51,14 @@ class WebSocketClientHandlerInterface(ABC):
 class ChatServerInterface(ABC):
     conversations: Dict[str, Conversation]
     users: Dict[str, WebSocketClientHandlerInterface]
+    user_conversations: Dict[str, OrderedSet]
+    binary_users: Set[str]
+    direct_users: Set[str]
+
+    @abstractmethod
+    async def start(self) -> None:
+        """Start background services such as the message broker subscription."""
+        pass
 
     @abstractmethod
     def get_users(self) -> Dict[str, WebSocketClientHandlerInterface]:
@@ -43,8 +71,32 @@ class ChatServerInterface(ABC):
         pass
 
     @abstractmethod
-    async def handle_user_websocket(self, username: str, ws: WebSocket) -> None:
-        """Handle a user's WebSocket connection."""
+    def directory(self) -> Tuple[str, str]:
+        """Serialized conversation list and its ETag, rebuilt only after changes."""
+        pass
+
+    @abstractmethod
+    async def handle_user_websocket(
+        self,
+        username: str,
+        ws: WebSocket,
+        batching: bool = False,
+        binary: bool = False,
+    ) -> None:
+        """Handle a user's WebSocket connection.
+
+        ``batching`` coalesces outbound frames and ``binary`` switches the user
+        to the MessagePack subprotocol.
+        """
+        pass
+
+    @abstractmethod
+    def connect_direct(self, username: str) -> WebSocketClientHandlerInterface:
+        """Register an in-process client and serve it until it disconnects.
+
+        The returned handler exchanges event objects over queues instead of a
+        socket.
+        """
         pass
 
     @abstractmethod
@@ -53,8 +105,14 @@ class ChatServerInterface(ABC):
         pass
 
     @abstractmethod
-    async def user_join(self, username: str, conversation_id: str) -> None:
-        """Add a user to a conversation."""
+    async def user_join(
+        self, username: str, conversation_id: str, since: Optional[int] = None
+    ) -> None:
+        """Add a user to a conversation.
+
+        With ``since`` the user also gets the events after that sequence number
+        that are still in memory, so a reconnecting client can catch up.
+        """
         pass
 
     @abstractmethod
@@ -62,11 +120,71 @@ class ChatServerInterface(ABC):
         """Remove a user from a conversation."""
         pass
 
+    @abstractmethod
+    async def admit(self, username: str, conversation_id: str) -> bool:
+        """Apply the rate limits to an incoming message.
+
+        Returns False when the message must be dropped and raises
+        RateLimitExceeded when it must be rejected.
+        """
+        pass
+
     @abstractmethod
     async def send_message(self, message: ServerMessage) -> None:
         """Send a message to all users in a conversation."""
         pass
 
+    @abstractmethod
+    async def send_messages(self, messages: Iterable[ServerMessage]) -> None:
+        """Send many messages with one fan-out pass per conversation."""
+        pass
+
+    @abstractmethod
+    async def users_join(self, conversation_id: str, usernames: Iterable[str]) -> None:
+        """Add several users to a conversation."""
+        pass
+
+    @abstractmethod
+    async def users_leave(self, conversation_id: str, usernames: Iterable[str]) -> None:
+        """Remove several users from a conversation."""
+        pass
+
+    @abstractmethod
+    async def deliver_message(self, origin: str, message: ServerMessage) -> None:
+        """Record a published message and send it to the local members."""
+        pass
+
+    @abstractmethod
+    async def deliver_messages(
+        self, origin: str, messages: List[ServerMessage]
+    ) -> None:
+        """Record published messages of one conversation and fan them out together."""
+        pass
+
+    @abstractmethod
+    async def deliver_disconnect(self, origin: str, username: str) -> None:
+        """Drop the memberships of a user that disconnected from any worker."""
+        pass
+
+    @abstractmethod
+    async def deliver_notify(
+        self, origin: str, username: str, message: ServerMessage
+    ) -> None:
+        """Send an event published for one user if they are connected here."""
+        pass
+
+    @abstractmethod
+    async def broadcast(self, usernames: Iterable[str], message: ServerMessage) -> None:
+        """Serialize a message once and send the same frame to many users."""
+        pass
+
+    @abstractmethod
+    async def broadcast_many(
+        self, usernames: Iterable[str], messages: List[ServerMessage]
+    ) -> None:
+        """Send several frames to each user, visiting every user once."""
+        pass
+
     @abstractmethod
     async def notify(self, username: str, message: ServerMessage) -> None:
         """Send a notification to a specific user."""
@@ -77,6 +195,27 @@ class ChatServerInterface(ABC):
         """Retrieve a specific conversation by its ID."""
         pass
 
+    @abstractmethod
+    async def page(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> Optional[List[ServerMessage]]:
+        """A page of a conversation's history, or None if it does not exist."""
+        pass
+
+    @abstractmethod
+    def slow_consumers(self) -> Dict[str, Dict[str, int]]:
+        """Outbound queue counters of users whose queue has overflowed."""
+        pass
+
+    @abstractmethod
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the message histories of all conversations."""
+        pass
+
     @abstractmethod
     async def close(
         self,
@@ -84,5 +223,9 @@ class ChatServerInterface(ABC):
         content: str = "Server is shutting down",
         timeout: int = 2,
     ) -> None:
-        """Close the server and optionally notify users."""
+        """Close the server and optionally notify users.
+
+        Each connection is closed as soon as its queued frames are sent, waiting
+        at most ``timeout`` seconds, then pending history is persisted.
+        """
         pass
@@ -0,0 +1,153 @@
+"""Metrics exported in the Prometheus text format.
+
+Counters and histograms are updated on the hot path; gauges are computed from
+a callback only when the registry is rendered. Components take an optional
+registry and skip all timing when it is ``None``.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Optional, Sequence, Union
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+GaugeValue = Union[float, dict[str, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """A monotonic counter, optionally split by the values of one ``label``."""
+
+    def __init__(self, name: str, help: str, label: str = "") -> None:
+        self.name: str = name
+        self.help: str = help
+        self.label: str = label
+        self.value: float = 0
+        self.values: dict[str, float] = {}
+
+    def inc(self, amount: float = 1, key: Optional[str] = None) -> None:
+        if key is None:
+            self.value += amount
+        else:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if not self.label:
+            lines.append(f"{self.name} {_format(self.value)}")
+        for key, v in self.values.items():
+            lines.append(f'{self.name}{{{self.label}="{_escape(key)}"}} {_format(v)}')
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: list[int] = [0] * (len(self.buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Gauge:
+    """A gauge read from ``collect`` at render time.
+
+    ``collect`` returns a number, or a mapping of ``label`` values to numbers.
+    """
+
+    def __init__(
+        self, name: str, help: str, collect: Callable[[], GaugeValue], label: str = ""
+    ) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.collect: Callable[[], GaugeValue] = collect
+        self.label: str = label
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.collect()
+        if isinstance(value, dict):
+            for key, v in value.items():
+                lines.append(
+                    f'{self.name}{{{self.label}="{_escape(key)}"}} {_format(v)}'
+                )
+        else:
+            lines.append(f"{self.name} {_format(value)}")
+        return lines
+
+
+Metric = Union[Counter, Histogram, Gauge]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label: str = "") -> Counter:
+        return self._register(Counter(name, help, label))  # type: ignore
+
+    def histogram(
+        self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets))  # type: ignore
+
+    def gauge(
+        self, name: str, help: str, collect: Callable[[], GaugeValue], label: str = ""
+    ) -> Gauge:
+        return self._register(Gauge(name, help, collect, label))  # type: ignore
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
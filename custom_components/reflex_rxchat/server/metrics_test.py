@@ -0,0 +1,54 @@
+import pytest
+
+from reflex_rxchat.server.metrics import MetricsRegistry
+
+
+def test_counter_and_histogram_render():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("rxchat_test_total", "A counter.")
+    histogram = metrics.histogram("rxchat_test_seconds", "A histogram.", (0.1, 1))
+    counter.inc()
+    counter.inc(2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE rxchat_test_total counter" in lines
+    assert "rxchat_test_total 3" in lines
+    assert 'rxchat_test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'rxchat_test_seconds_bucket{le="1"} 2' in lines
+    assert 'rxchat_test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "rxchat_test_seconds_sum 5.55" in lines
+    assert "rxchat_test_seconds_count 3" in lines
+
+
+def test_labelled_counter_renders_one_line_per_value():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("rxchat_outcomes_total", "Outcomes.", label="outcome")
+    counter.inc(key="allowed")
+    counter.inc(2, key="dropped")
+    counter.inc(key="allowed")
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE rxchat_outcomes_total counter" in lines
+    assert 'rxchat_outcomes_total{outcome="allowed"} 2' in lines
+    assert 'rxchat_outcomes_total{outcome="dropped"} 2' in lines
+
+
+def test_gauge_is_collected_on_render():
+    metrics = MetricsRegistry()
+    rooms = {'a"b': 2}
+    metrics.gauge("rxchat_members", "Members.", lambda: rooms, label="conversation")
+    rooms["c"] = 1
+
+    text = metrics.render()
+    assert 'rxchat_members{conversation="a\\"b"} 2' in text
+    assert 'rxchat_members{conversation="c"} 1' in text
+
+
+def test_duplicate_metric_names_are_rejected():
+    metrics = MetricsRegistry()
+    metrics.counter("rxchat_total", "A counter.")
+    with pytest.raises(ValueError):
+        metrics.counter("rxchat_total", "Again.")
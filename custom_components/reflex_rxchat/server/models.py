@@ -1,29 +1,124 @@
+from bisect import bisect_left
+from itertools import islice
+from typing import Iterable, Optional
+
 import reflex as rx
+from pydantic.v1 import validator
+
+from .events import Message, ServerMessage
+from .history import DEFAULT_HISTORY_SIZE, MessageHistory
+from .storage import HistoryStore
+
+
+class OrderedSet(dict[str, None]):
+    """Insertion-ordered set of strings with O(1) membership, add and discard."""
 
-from .events import Message
+    def __init__(self, items: Iterable[str] = ()) -> None:
+        super().__init__(dict.fromkeys(items))
+
+    def add(self, item: str) -> None:
+        self[item] = None
+
+    def discard(self, item: str) -> None:
+        self.pop(item, None)
+
+    def remove(self, item: str) -> None:
+        del self[item]
 
 
 class Conversation(rx.Model):
     id: str
     title: str
-    usernames: list[str] = []
-    messages: list[Message] = []
+    usernames: OrderedSet = None  # type: ignore[assignment]
+    history_size: Optional[int] = DEFAULT_HISTORY_SIZE
+    messages: MessageHistory = None  # type: ignore[assignment]
+    store: Optional[HistoryStore] = None
+    seq: int = 0
+
+    @validator("usernames", pre=True, always=True)
+    def _ordered_usernames(cls, usernames) -> OrderedSet:
+        return OrderedSet(usernames or ())
 
-    def add_message(self, message: Message):
-        if message.username not in self.usernames:
-            self.usernames.append(message.username)
+    @validator("messages", pre=True, always=True)
+    def _bounded_messages(cls, messages, values) -> MessageHistory:
+        return MessageHistory(messages or (), capacity=values.get("history_size"))
+
+    def add_message(self, message: Message, persist: bool = True):
+        # Presence diffs carry no username.
+        username = getattr(message, "username", None)
+        if username is not None and username not in self.usernames:
+            self.usernames.add(username)
+        if message.seq is None:
+            message.seq = self.next_seq()
+        elif message.seq > self.seq:
+            # Numbered by the broker.
+            self.seq = message.seq
+        else:
+            raise ValueError(
+                f"Event seq {message.seq} of {self.id} is not after {self.seq}"
+            )
         self.messages.append(message)
+        if persist and self.store is not None:
+            self.store.append(self.id, message)
+
+    def next_seq(self) -> int:
+        """Reserve the sequence number of the next event."""
+        self.seq += 1
+        return self.seq
 
     def remove_user(self, username: str):
         self.usernames.remove(username)
 
     def user_count(self) -> int:
-        return len([username for username in self.usernames if username != "_system"])
+        return len(self.usernames) - ("_system" in self.usernames)
+
+    def memory_usage(self) -> int:
+        return self.messages.memory_usage()
+
+    def dict(self, **kwargs) -> dict:
+        data = super().dict(**kwargs)
+        data.pop("store", None)
+        data["usernames"] = list(self.usernames)
+        if "messages" in data:
+            data["messages"] = [m.dict() for m in self.messages]
+        return data
 
     def tail(self, num_messages: int) -> "Conversation":
         return Conversation(
             id=self.id,
             title=self.title,
             usernames=self.usernames,
-            messages=self.messages[:num_messages],
+            history_size=num_messages,
+            messages=self.messages.tail(num_messages),
+            seq=self.seq,
         )
+
+    def since(self, seq: int) -> list[ServerMessage]:
+        """Messages of the in-memory window newer than ``seq``."""
+        start = bisect_left(self.messages, seq + 1, key=lambda m: m.seq)
+        return list(islice(self.messages, start, None))
+
+    async def page(
+        self,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> list[ServerMessage]:
+        """Up to ``limit`` messages around a sequence number cursor, oldest first.
+
+        Pages are served from the hot window when it holds all of them and from
+        the store otherwise.
+        """
+        window = self.messages
+        oldest = window[0].seq if window else self.seq + 1
+        if after is not None:
+            start = bisect_left(window, after + 1, key=lambda m: m.seq)
+            if after + 1 >= oldest or self.store is None:
+                return list(islice(window, start, start + limit))
+            return await self.store.load(self.id, limit, after=after)
+        end = len(window)
+        if before is not None:
+            end = bisect_left(window, before, key=lambda m: m.seq)
+        if end >= limit or self.store is None or oldest <= 1:
+            return list(islice(window, max(end - limit, 0), end))
+        return await self.store.load(self.id, limit, before=before)
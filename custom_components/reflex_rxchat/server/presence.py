@@ -0,0 +1,101 @@
+"""Coalesced presence updates.
+
+Announcing every join and leave to every member costs O(N²) frames when N
+users enter a room at once, as they do when clients reconnect after a deploy.
+``PresenceAggregator`` collects membership changes per conversation and sends
+one ``EventConversationPresence`` diff per conversation every ``interval``
+seconds. A user that joins and leaves within one interval is not announced.
+
+Conversations with at least ``large_room_size`` members send no presence
+events at all; members only learn the room's size.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from . import logger
+from .events import EventConversationPresence, ServerMessage
+from .models import Conversation, OrderedSet
+
+DEFAULT_PRESENCE_INTERVAL: float = 1.0
+
+SendCallback = Callable[[list[ServerMessage]], Awaitable[None]]
+
+
+class PresenceAggregator:
+    def __init__(
+        self,
+        send: SendCallback,
+        interval: float = DEFAULT_PRESENCE_INTERVAL,
+        large_room_size: Optional[int] = None,
+    ) -> None:
+        self.send: SendCallback = send
+        self.interval: float = interval
+        self.large_room_size: Optional[int] = large_room_size
+        self.pending: dict[str, tuple[Conversation, OrderedSet, OrderedSet]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_large(self, conversation: Conversation) -> bool:
+        return (
+            self.large_room_size is not None
+            and conversation.user_count() >= self.large_room_size
+        )
+
+    def _changes(self, conversation: Conversation) -> tuple[OrderedSet, OrderedSet]:
+        _, joined, left = self.pending.setdefault(
+            conversation.id, (conversation, OrderedSet(), OrderedSet())
+        )
+        return joined, left
+
+    def joined(self, conversation: Conversation, username: str) -> None:
+        """Record that ``username`` was added to the conversation."""
+        if self.is_large(conversation):
+            return
+        joined, left = self._changes(conversation)
+        if username in left:
+            left.discard(username)
+        else:
+            joined.add(username)
+
+    def left(self, conversation: Conversation, username: str) -> None:
+        """Record that ``username`` was removed from the conversation."""
+        if self.is_large(conversation):
+            return
+        joined, left = self._changes(conversation)
+        if username in joined:
+            joined.discard(username)
+        else:
+            left.add(username)
+
+    async def flush(self) -> None:
+        """Send the changes collected since the last flush."""
+        pending, self.pending = self.pending, {}
+        events: list[ServerMessage] = [
+            EventConversationPresence(
+                conversation_id=cid,
+                joined=list(joined),
+                left=list(left),
+                users_count=conversation.user_count(),
+            )
+            for cid, (conversation, joined, left) in pending.items()
+            if joined or left
+        ]
+        if events:
+            await self.send(events)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as ex:
+                logger.error(f"Unable to send presence updates: {ex!r}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
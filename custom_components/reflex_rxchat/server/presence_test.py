@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from reflex_rxchat.server.events import EventConversationPresence
+from reflex_rxchat.server.models import Conversation
+from reflex_rxchat.server.presence import PresenceAggregator
+
+
+@pytest.mark.asyncio
+async def test_flush_sends_one_diff_per_conversation():
+    send = AsyncMock()
+    presence = PresenceAggregator(send)
+    tech = Conversation(id="Tech", title="Tech", usernames=["a", "b", "c"])
+    jokes = Conversation(id="Jokes", title="Jokes")
+
+    for username in ("a", "b", "c", "d"):
+        presence.joined(tech, username)
+    presence.left(tech, "d")
+    presence.left(tech, "e")
+    presence.left(jokes, "x")
+    presence.joined(jokes, "x")
+    await presence.flush()
+
+    send.assert_awaited_once_with(
+        [
+            EventConversationPresence(
+                conversation_id="Tech",
+                joined=["a", "b", "c"],
+                left=["e"],
+                users_count=3,
+            )
+        ]
+    )
+    await presence.flush()
+    send.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_large_rooms_send_no_presence():
+    send = AsyncMock()
+    presence = PresenceAggregator(send, large_room_size=2)
+    room = Conversation(id="Big", title="Big", usernames=["a", "b"])
+
+    presence.joined(room, "b")
+    presence.left(room, "c")
+    await presence.close()
+
+    assert presence.is_large(room)
+    send.assert_not_awaited()
@@ -0,0 +1,177 @@
+"""Token-bucket limits on incoming chat messages.
+
+Every message costs one token from the bucket of its sender and one from the
+bucket of its conversation. Buckets refill at ``rate`` tokens per second up to
+``burst``. When either bucket is empty the policy decides what happens:
+``REJECT`` raises ``RateLimitExceeded``, ``DROP`` discards the message and
+``DELAY`` holds it until the tokens are available, dropping it if that would
+take longer than ``max_delay`` seconds.
+"""
+
+import asyncio
+import time
+from enum import StrEnum
+from typing import Optional
+
+from .metrics import Counter
+
+DEFAULT_MAX_DELAY: float = 5.0
+# Full buckets are forgotten once this many are tracked.
+MAX_BUCKETS: int = 10000
+
+
+class RateLimitPolicy(StrEnum):
+    """What to do with a message that exceeds a rate limit."""
+
+    REJECT = "reject"
+    DELAY = "delay"
+    DROP = "drop"
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, key: str, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.key: str = key
+        self.retry_after: float = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.updated: float = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self) -> float:
+        """Seconds until a token is available, after ``refill``."""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Per-user and per-conversation token buckets.
+
+    A ``None`` rate disables that limit; ``burst`` defaults to one second of
+    traffic.
+    """
+
+    def __init__(
+        self,
+        user_rate: Optional[float] = None,
+        user_burst: Optional[float] = None,
+        conversation_rate: Optional[float] = None,
+        conversation_burst: Optional[float] = None,
+        policy: RateLimitPolicy = RateLimitPolicy.REJECT,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ) -> None:
+        self.user_rate: Optional[float] = user_rate
+        self.user_burst: float = user_burst or max(user_rate or 1, 1)
+        self.conversation_rate: Optional[float] = conversation_rate
+        self.conversation_burst: float = conversation_burst or max(
+            conversation_rate or 1, 1
+        )
+        self.policy: RateLimitPolicy = policy
+        self.max_delay: float = max_delay
+        self.users: dict[str, TokenBucket] = {}
+        self.conversations: dict[str, TokenBucket] = {}
+        self.allowed: int = 0
+        self.delayed: int = 0
+        self.dropped: int = 0
+        self.rejected: int = 0
+        # Outcome totals, labelled by outcome, when metrics are enabled.
+        self.outcomes: Optional[Counter] = None
+
+    def _bucket(
+        self,
+        buckets: dict[str, TokenBucket],
+        key: str,
+        rate: float,
+        burst: float,
+        now: float,
+    ) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_BUCKETS:
+                self._prune(buckets, now)
+            bucket = buckets[key] = TokenBucket(rate, burst, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    @staticmethod
+    def _prune(buckets: dict[str, TokenBucket], now: float) -> None:
+        for key, bucket in list(buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst:
+                del buckets[key]
+
+    async def acquire(self, username: str, conversation_id: str) -> bool:
+        """Take the tokens for one message; False if it must be dropped.
+
+        Raises ``RateLimitExceeded`` under the ``REJECT`` policy.
+        """
+        now = time.monotonic()
+        buckets: list[tuple[str, TokenBucket]] = []
+        if self.user_rate is not None:
+            buckets.append(
+                (
+                    f"user {username}",
+                    self._bucket(
+                        self.users, username, self.user_rate, self.user_burst, now
+                    ),
+                )
+            )
+        if self.conversation_rate is not None:
+            buckets.append(
+                (
+                    f"conversation {conversation_id}",
+                    self._bucket(
+                        self.conversations,
+                        conversation_id,
+                        self.conversation_rate,
+                        self.conversation_burst,
+                        now,
+                    ),
+                )
+            )
+        key, wait = max(
+            ((key, bucket.wait()) for key, bucket in buckets),
+            key=lambda item: item[1],
+            default=("", 0.0),
+        )
+        if wait > 0:
+            if self.policy == RateLimitPolicy.REJECT:
+                self.rejected += 1
+                self._count("rejected")
+                raise RateLimitExceeded(key, wait)
+            if self.policy == RateLimitPolicy.DROP or wait > self.max_delay:
+                self.dropped += 1
+                self._count("dropped")
+                return False
+        # Under DELAY the tokens go into debt, so later messages wait longer.
+        for _, bucket in buckets:
+            bucket.tokens -= 1
+        if wait > 0:
+            self.delayed += 1
+            self._count("delayed")
+            await asyncio.sleep(wait)
+        self.allowed += 1
+        self._count("allowed")
+        return True
+
+    def _count(self, outcome: str) -> None:
+        if self.outcomes is not None:
+            self.outcomes.inc(key=outcome)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "delayed": self.delayed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
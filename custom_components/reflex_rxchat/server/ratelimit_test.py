@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import patch
+
+from reflex_rxchat.server.ratelimit import (
+    RateLimiter,
+    RateLimitExceeded,
+    RateLimitPolicy,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with (
+        patch("reflex_rxchat.server.ratelimit.time", clock),
+        patch("reflex_rxchat.server.ratelimit.asyncio", clock),
+    ):
+        yield clock
+
+
+@pytest.mark.asyncio
+async def test_reject_after_burst_and_refill(clock):
+    limiter = RateLimiter(user_rate=2, user_burst=2)
+    assert await limiter.acquire("alice", "Tech")
+    assert await limiter.acquire("alice", "Tech")
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.acquire("alice", "Tech")
+    assert exc.value.key == "user alice"
+    assert exc.value.retry_after == pytest.approx(0.5)
+    assert await limiter.acquire("bob", "Tech")
+
+    clock.now += 0.5
+    assert await limiter.acquire("alice", "Tech")
+    assert limiter.stats() == {"allowed": 4, "delayed": 0, "dropped": 0, "rejected": 1}
+
+
+@pytest.mark.asyncio
+async def test_conversation_limit_is_shared(clock):
+    limiter = RateLimiter(conversation_rate=1, policy=RateLimitPolicy.DROP)
+    assert await limiter.acquire("alice", "Tech")
+    assert not await limiter.acquire("bob", "Tech")
+    assert await limiter.acquire("bob", "Jokes")
+    assert limiter.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_delay_queues_messages(clock):
+    limiter = RateLimiter(user_rate=10, user_burst=1, policy=RateLimitPolicy.DELAY)
+    start = clock.now
+    for _ in range(3):
+        assert await limiter.acquire("alice", "Tech")
+    assert clock.now - start == pytest.approx(0.2)
+    assert limiter.delayed == 2
+
+    limiter.max_delay = 0.05
+    clock.now += 0.2
+    assert await limiter.acquire("alice", "Tech")
+    assert not await limiter.acquire("alice", "Tech")
@@ -0,0 +1,136 @@
+"""Warm-restart snapshots of conversations.
+
+A snapshot records every conversation's id, title, sequence number and
+in-memory message window so a restarted server comes back with warm rooms
+instead of empty ones. Members are not recorded; clients rejoin after a
+restart and resume from their last sequence number.
+
+The file is laid out to be memory-mapped::
+
+    MAGIC | index length (uint32) | index | windows
+
+The index is a JSON array of ``[id, title, seq, offset, length]`` entries and
+each window is a JSON array of events, as sent to batching clients. Opening a
+snapshot only parses the index; a window is decoded the first time its
+conversation is used, and windows that were never decoded are copied byte for
+byte into the next snapshot.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, NamedTuple, Optional
+
+from .codec import decode_server_message, loads
+from .models import Conversation
+from .events import ServerMessage
+
+DEFAULT_SNAPSHOT_INTERVAL: float = 60.0
+MAGIC: bytes = b"RXSNAP02"
+HEADER: struct.Struct = struct.Struct(f"<{len(MAGIC)}sI")
+# Types of an index entry: id, title, seq, offset, length.
+ENTRY_TYPES: tuple[type, ...] = (str, str, int, int, int)
+
+
+class SnapshotEntry(NamedTuple):
+    title: str
+    seq: int
+    offset: int
+    length: int
+
+
+def pack_window(conversation: Conversation) -> bytes:
+    """Encode the message window of a conversation, empty if it has none."""
+    if not conversation.messages:
+        return b""
+    return ("[" + ",".join(m.json() for m in conversation.messages) + "]").encode()
+
+
+def write_snapshot(path: str, entries: Iterable[tuple[str, str, int, bytes]]) -> None:
+    """Atomically replace ``path`` with ``(id, title, seq, window)`` entries."""
+    index = []
+    windows = []
+    offset = 0
+    for cid, title, seq, window in entries:
+        index.append([cid, title, seq, offset, len(window)])
+        windows.append(window)
+        offset += len(window)
+    packed_index = json.dumps(index).encode()
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(packed_index)))
+        f.write(packed_index)
+        f.writelines(windows)
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers keep their mapping of the replaced file.
+    os.replace(tmp, path)
+
+
+def is_entry(item: object) -> bool:
+    """Whether an index item is an ``[id, title, seq, offset, length]`` list."""
+    return (
+        isinstance(item, list)
+        and len(item) == len(ENTRY_TYPES)
+        and all(isinstance(value, t) for value, t in zip(item, ENTRY_TYPES))
+    )
+
+
+class Snapshot:
+    """Read side of a snapshot file, mapped into memory."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(path)
+        except BaseException:
+            self._map.close()
+            raise
+        # Conversations whose window has not been decoded yet.
+        self.cold: set[str] = set(self.entries)
+
+    def _parse(self, path: str) -> None:
+        """Read the header and index, raising if the file is not a whole snapshot."""
+        magic, size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a chat snapshot")
+        start, end = HEADER.size, HEADER.size + size
+        index = loads(self._map[start:end])
+        if not isinstance(index, list) or not all(map(is_entry, index)):
+            raise ValueError(f"{path} has a malformed index")
+        self._base: int = end
+        self.entries: dict[str, SnapshotEntry] = {
+            cid: SnapshotEntry(title, seq, offset, length)
+            for cid, title, seq, offset, length in index
+        }
+        if any(
+            end + e.offset + e.length > len(self._map) for e in self.entries.values()
+        ):
+            raise ValueError(f"{path} is truncated")
+
+    @classmethod
+    def open(cls, path: str) -> Optional["Snapshot"]:
+        """Map ``path``, or return None when there is no snapshot yet."""
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def raw(self, conversation_id: str) -> bytes:
+        """Encoded window of a conversation."""
+        entry = self.entries[conversation_id]
+        start = self._base + entry.offset
+        end = start + entry.length
+        return self._map[start:end]
+
+    def take(self, conversation_id: str) -> list[ServerMessage]:
+        """Decode a cold window; later calls for the same conversation return []."""
+        if conversation_id not in self.cold:
+            return []
+        self.cold.discard(conversation_id)
+        data = self.raw(conversation_id)
+        return [decode_server_message(item) for item in loads(data)] if data else []
+
+    def close(self) -> None:
+        self._map.close()
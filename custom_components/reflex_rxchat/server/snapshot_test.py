@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import AsyncMock
+from reflex_rxchat.server.chat_server import ChatServer
+from reflex_rxchat.server.events import Message
+from reflex_rxchat.server.models import Conversation
+from reflex_rxchat.server.snapshot import (
+    HEADER,
+    MAGIC,
+    Snapshot,
+    pack_window,
+    write_snapshot,
+)
+
+
+def with_index(index: bytes) -> bytes:
+    return HEADER.pack(MAGIC, len(index)) + index
+
+
+def make_conversation(cid: str, count: int) -> Conversation:
+    conversation = Conversation(id=cid, title=cid.title())
+    for i in range(count):
+        conversation.add_message(
+            Message(conversation_id=cid, username="alice", content=f"m{i}")
+        )
+    return conversation
+
+
+def test_snapshot_round_trip_decodes_windows_once(tmp_path):
+    path = str(tmp_path / "chat.snapshot")
+    rooms = [make_conversation("busy", 3), make_conversation("quiet", 0)]
+    write_snapshot(path, [(c.id, c.title, c.seq, pack_window(c)) for c in rooms])
+
+    snapshot = Snapshot(path)
+    assert snapshot.entries["busy"].title == "Busy"
+    assert snapshot.entries["busy"].seq == 3
+    assert snapshot.cold == {"busy", "quiet"}
+    assert [(m.content, m.seq) for m in snapshot.take("busy")] == [
+        ("m0", 1),
+        ("m1", 2),
+        ("m2", 3),
+    ]
+    assert snapshot.take("busy") == []
+    assert snapshot.take("quiet") == []
+    assert not snapshot.cold
+    snapshot.close()
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "chat.snapshot"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+    assert Snapshot.open(str(tmp_path / "missing")) is None
+
+
+def test_snapshot_rejects_truncated_files(tmp_path):
+    path = tmp_path / "chat.snapshot"
+    room = make_conversation("busy", 3)
+    write_snapshot(str(path), [(room.id, room.title, room.seq, pack_window(room))])
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"RX",
+        b"not a snapshot at all",
+        with_index(b"null"),
+        with_index(b"3"),
+        with_index(b'[["Tech", "Tech", 1]]'),
+        with_index(b'[["Tech", "Tech", 1, "0", 0]]'),
+    ],
+)
+async def test_chat_server_starts_cold_from_a_bad_snapshot(tmp_path, content):
+    path = tmp_path / "chat.snapshot"
+    path.write_bytes(content)
+    server = ChatServer(snapshot_path=str(path), snapshot_interval=None)
+    await server.start()
+    assert server.snapshot is None
+    assert (tmp_path / "chat.snapshot.bad").read_bytes() == content
+    await server.close()
+    snapshot = Snapshot(str(path))
+    assert snapshot.entries.keys() == server.conversations.keys()
+    snapshot.close()
+
+
+@pytest.mark.asyncio
+async def test_chat_server_restarts_with_warm_rooms(tmp_path):
+    path = str(tmp_path / "chat.snapshot")
+    server = ChatServer(snapshot_path=path, snapshot_interval=None)
+    await server.start()
+    await server.user_join("alice", "Tech")
+    await server.user_join("alice", "Jokes")
+    await server.send_message(
+        Message(conversation_id="Tech", username="alice", content="hello")
+    )
+    await server.close()
+
+    restarted = ChatServer(snapshot_path=path, snapshot_interval=None)
+    await restarted.start()
+    assert restarted.snapshot is not None
+    assert restarted.conversations["Tech"].seq == 2
+    assert not restarted.conversations["Tech"].messages
+    assert not restarted.conversations["Tech"].usernames
+
+    tech = restarted.get_conversation("Tech")
+    assert tech is not None
+    assert [m.seq for m in tech.messages] == [1, 2]
+    assert tech.messages[1].content == "hello"
+    assert restarted.snapshot.cold == {"Jokes", "Welcome"}
+
+    # Rooms not used since the restart keep their window in the next snapshot.
+    await restarted.send_message(
+        Message(conversation_id="Tech", username="bob", content="again")
+    )
+    assert await restarted.save_snapshot()
+    assert not await restarted.save_snapshot()
+    await restarted.close()
+
+    snapshot = Snapshot(path)
+    assert [m.username for m in snapshot.take("Jokes")] == ["alice"]
+    assert snapshot.entries["Jokes"].seq == 1
+    assert snapshot.take("Tech")[-1].content == "again"
+    snapshot.close()
+
+
+@pytest.mark.asyncio
+async def test_corrupt_window_leaves_the_room_empty(tmp_path):
+    path = str(tmp_path / "chat.snapshot")
+    window = b'[{"event": "conversation.message", "conversation_id": "Tech"}]'
+    write_snapshot(path, [("Tech", "Tech", 4, window)])
+    server = ChatServer(snapshot_path=path, snapshot_interval=None)
+    server.notify = AsyncMock()
+    await server.start()
+
+    await server.user_join("alice", "Tech")
+
+    tech = server.conversations["Tech"]
+    assert [m.username for m in tech.messages] == ["alice"]
+    assert tech.messages[0].seq == 5
+    await server.close()
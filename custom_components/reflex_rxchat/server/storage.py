@@ -0,0 +1,192 @@
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from . import logger
+from .codec import decode_server_message, loads
+from .events import ServerMessage
+
+
+class HistoryStore(ABC):
+    """Persistent backend for conversation history.
+
+    ``append`` is called on the broadcast hot path and must not wait on I/O;
+    implementations are expected to buffer writes and persist them later.
+    """
+
+    @abstractmethod
+    def append(self, conversation_id: str, message: ServerMessage) -> None:
+        """Schedule a message to be persisted."""
+        pass
+
+    @abstractmethod
+    async def load(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> list[ServerMessage]:
+        """Return up to ``limit`` persisted messages, oldest first.
+
+        Without a cursor these are the newest messages. ``before`` returns the
+        newest messages with a lower sequence number and ``after`` the oldest
+        messages with a higher one.
+        """
+        pass
+
+    @abstractmethod
+    async def last_seqs(self) -> dict[str, int]:
+        """Highest persisted sequence number of every conversation."""
+        pass
+
+    @abstractmethod
+    async def flush(self) -> None:
+        """Persist every pending message."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Flush pending messages and release the backend."""
+        pass
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """SQLite history with write-behind batching.
+
+    Messages are buffered in memory and written in a single transaction once
+    ``batch_size`` messages are pending or ``flush_interval`` seconds have
+    passed. Database calls run in a worker thread.
+    """
+
+    def __init__(
+        self, path: str, batch_size: int = 500, flush_interval: float = 0.05
+    ) -> None:
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.pending: list[tuple[str, Optional[int], str]] = []
+        self._db: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " conversation_id TEXT NOT NULL,"
+            " seq INTEGER,"
+            " payload TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS messages_conversation"
+            " ON messages (conversation_id, id)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS messages_conversation_seq"
+            " ON messages (conversation_id, seq)"
+        )
+        self._db.commit()
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed: bool = False
+
+    def append(self, conversation_id: str, message: ServerMessage) -> None:
+        self.pending.append(
+            (conversation_id, getattr(message, "seq", None), message.json())
+        )
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def load(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> list[ServerMessage]:
+        await self.flush()
+        async with self._lock:
+            rows = await asyncio.to_thread(
+                self._read, conversation_id, limit, before, after
+            )
+        if after is None:
+            rows.reverse()
+        return [decode_server_message(loads(payload)) for (payload,) in rows]
+
+    async def last_seqs(self) -> dict[str, int]:
+        await self.flush()
+        async with self._lock:
+            rows = await asyncio.to_thread(
+                lambda: self._db.execute(
+                    "SELECT conversation_id, MAX(seq) FROM messages"
+                    " WHERE seq IS NOT NULL GROUP BY conversation_id"
+                ).fetchall()
+            )
+        return dict(rows)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception:
+                # Retry on the next flush, ahead of messages queued meanwhile.
+                self.pending[:0] = batch
+                raise
+
+    async def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        self._db.close()
+
+    def _read(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[int],
+        after: Optional[int],
+    ) -> list[tuple[str]]:
+        if after is not None:
+            return self._db.execute(
+                "SELECT payload FROM messages WHERE conversation_id = ? AND seq > ?"
+                " ORDER BY seq LIMIT ?",
+                (conversation_id, after, limit),
+            ).fetchall()
+        if before is not None:
+            return self._db.execute(
+                "SELECT payload FROM messages WHERE conversation_id = ? AND seq < ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (conversation_id, before, limit),
+            ).fetchall()
+        return self._db.execute(
+            "SELECT payload FROM messages WHERE conversation_id = ?"
+            " ORDER BY id DESC LIMIT ?",
+            (conversation_id, limit),
+        ).fetchall()
+
+    def _write(self, batch: list[tuple[str, Optional[int], str]]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO messages (conversation_id, seq, payload) VALUES (?, ?, ?)",
+                batch,
+            )
+
+    async def _flush_loop(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error as ex:
+                logger.error(f"Unable to persist chat history: {ex}")
@@ -0,0 +1,109 @@
+import sqlite3
+import pytest
+from reflex_rxchat.server.events import Message
+from reflex_rxchat.server.models import Conversation
+from reflex_rxchat.server.storage import SQLiteHistoryStore
+
+
+def make_message(content: str) -> Message:
+    return Message(conversation_id="c", username="alice", content=content)
+
+
+@pytest.mark.asyncio
+async def test_append_is_buffered_until_flush(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"), flush_interval=60)
+    store.append("c", make_message("hello"))
+    assert len(store.pending) == 1
+
+    await store.flush()
+    assert store.pending == []
+    assert [m.content for m in await store.load("c", 10)] == ["hello"]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_load_returns_newest_messages_in_order(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"))
+    for i in range(5):
+        store.append("c", make_message(f"m{i}"))
+    store.append("other", make_message("x"))
+
+    assert [m.content for m in await store.load("c", 3)] == ["m2", "m3", "m4"]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_history_survives_reopen(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = SQLiteHistoryStore(path)
+    store.append("c", make_message("persisted"))
+    await store.close()
+
+    reopened = SQLiteHistoryStore(path)
+    assert [m.content for m in await reopened.load("c", 10)] == ["persisted"]
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_conversation_reads_past_hot_window(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"))
+    conversation = Conversation(id="c", title="c", history_size=2, store=store)
+    for i in range(4):
+        conversation.add_message(make_message(f"m{i}"))
+
+    assert [m.content for m in await conversation.page(2)] == ["m2", "m3"]
+    assert [m.content for m in await conversation.page(4)] == [
+        "m0",
+        "m1",
+        "m2",
+        "m3",
+    ]
+    assert "store" not in conversation.dict()
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_pages_by_sequence_number(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"))
+    conversation = Conversation(id="c", title="c", history_size=3, store=store)
+    for i in range(10):
+        conversation.add_message(make_message(f"m{i}"))
+
+    assert [m.seq for m in await conversation.page(2)] == [9, 10]
+    assert [m.seq for m in await conversation.page(3, before=9)] == [6, 7, 8]
+    assert [m.seq for m in await conversation.page(3, before=3)] == [1, 2]
+    assert [m.seq for m in await conversation.page(4, after=2)] == [3, 4, 5, 6]
+    assert [m.seq for m in await conversation.page(4, after=8)] == [9, 10]
+    assert await store.last_seqs() == {"c": 10}
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_pages_from_memory_without_store():
+    conversation = Conversation(id="c", title="c", history_size=5)
+    for i in range(10):
+        conversation.add_message(make_message(f"m{i}"))
+
+    assert [m.seq for m in await conversation.page(3, before=8)] == [6, 7]
+    assert [m.seq for m in await conversation.page(2, after=7)] == [8, 9]
+    assert await conversation.page(2, after=10) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_the_batch(tmp_path, monkeypatch):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"), flush_interval=60)
+    store.append("c", make_message("kept"))
+    write = store._write
+
+    def fail(batch):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_write", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        await store.flush()
+    assert len(store.pending) == 1
+
+    monkeypatch.setattr(store, "_write", write)
+    store.append("c", make_message("later"))
+    assert [m.content for m in await store.load("c", 10)] == ["kept", "later"]
+    await store.close()
@@ -1,43 +1,98 @@
 import asyncio
-from typing import AsyncGenerator
+import time
+from enum import StrEnum
+from typing import AsyncGenerator, Optional, Union
 from . import logger
 from .interfaces import WebSocketClientHandlerInterface, ChatServerInterface
-from .events import (
-    EventType,
-    ServerMessage,
-    Message,
-    RequestJoinConversation,
-    RequestLeaveConversation,
-)
+from .events import ClientMessage, EventType, Message, Ping, ServerMessage
+from .codec import decode_client_message, loads
+from .metrics import Counter, Histogram
+from .ratelimit import RateLimitExceeded
+from .wire import SUBPROTOCOL, pack_batch, pack_event, unpack_client_events
 
 from starlette.websockets import WebSocket, WebSocketState, WebSocketDisconnect
 
+DEFAULT_QUEUE_SIZE: int = 256
+DEFAULT_BATCH_WINDOW: float = 0.01
+DEFAULT_BATCH_SIZE: int = 64
+
+Frame = Union[str, bytes]
+
+
+class OverflowPolicy(StrEnum):
+    """What to do when a client's outbound queue is full."""
+
+    DROP_OLDEST = "drop_oldest"
+    DISCONNECT = "disconnect"
+    BLOCK = "block"
+
 
 class WebSocketClientHandler(WebSocketClientHandlerInterface):
-    def __init__(self, ws: WebSocket, username: str):
+    def __init__(
+        self,
+        ws: WebSocket,
+        username: str,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        batch_window: Optional[float] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        send_seconds: Optional[Histogram] = None,
+        dropped_frames: Optional[Counter] = None,
+        binary: bool = False,
+        heartbeat_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+    ):
         self.ws: WebSocket = ws
         self.username: str = username
+        self.binary: bool = binary
+        self.outbound: asyncio.Queue[Frame] = asyncio.Queue(maxsize=queue_size)
+        self.overflow: OverflowPolicy = overflow
+        self.batch_window: Optional[float] = batch_window
+        self.batch_size: int = batch_size
+        self.send_seconds: Optional[Histogram] = send_seconds
+        self.dropped_frames: Optional[Counter] = dropped_frames
+        self.overflows: int = 0
+        self.dropped: int = 0
+        self.evicted: bool = False
+        self.heartbeat_timeout: Optional[float] = heartbeat_timeout
+        self.idle_timeout: Optional[float] = idle_timeout
+        self.last_seen: float = time.monotonic()
+        self.last_active: float = self.last_seen
+        self._task: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.Task] = None
 
     def is_connected(self) -> bool:
-        return self.ws.state == WebSocketState.CONNECTED
+        return not self.evicted and self.ws.state == WebSocketState.CONNECTED
+
+    async def heartbeat(self, now: float) -> bool:
+        """Ping the client, or evict it if it stopped answering or went idle.
+
+        Any event from the client counts as an answer; only chat events reset
+        the idle timer. Returns False when the session was evicted.
+        """
+        if self.evicted:
+            return False
+        if self.idle_timeout is not None and now - self.last_active > self.idle_timeout:
+            self._evict("idle")
+            return False
+        if self.heartbeat_timeout is None:
+            return True
+        if now - self.last_seen > self.heartbeat_timeout:
+            self._evict("heartbeat timeout")
+            return False
+        # Never wait on a full queue here: under BLOCK it would stall the reaper.
+        if not self.outbound.full():
+            await self.send(Ping())
+        return True
 
     async def __call__(self, chat_state: ChatServerInterface) -> None:
         try:
-            await self.ws.accept()
+            await self.ws.accept(subprotocol=SUBPROTOCOL if self.binary else None)
             logger.info(f" - {self.username} connected")
+            self._task = asyncio.current_task()
+            self._writer = asyncio.create_task(self._drain())
             async for message in self.receive():
-                if message.event == EventType.CONVERSATION_MESSAGE:
-                    message.username = self.username
-                    try:
-                        await chat_state.send_message(message)
-                    finally:
-                        pass
-                elif message.event == EventType.REQUEST_CONVERSATION_JOIN:
-                    await chat_state.user_join(self.username, message.conversation_id)
-                elif message.event == EventType.REQUEST_CONVERSATION_LEAVE:
-                    await chat_state.user_leave(self.username, message.conversation_id)
-                else:
-                    raise RuntimeError(f"Unknown message type {message.event}")
+                await self.dispatch(chat_state, message)
         except (
             WebSocketDisconnect,
             asyncio.CancelledError,
@@ -48,37 +103,179 @@ class WebSocketClientHandler(WebSocketClientHandlerInterface):
         finally:
             logger.info(f" - {self.username} disconnected")
             users = chat_state.get_users()
-            if self.username in users.keys():
+            if users.get(self.username) is self:
                 del users[self.username]
             await self.close()
 
+    async def dispatch(
+        self, chat_state: ChatServerInterface, message: ClientMessage
+    ) -> None:
+        """Apply one event received from the client to the chat server."""
+        self.last_seen = time.monotonic()
+        if message.event == EventType.PONG:
+            return
+        self.last_active = self.last_seen
+        if message.event not in (
+            EventType.CONVERSATION_MESSAGE,
+            EventType.REQUEST_CONVERSATION_JOIN,
+            EventType.REQUEST_CONVERSATION_LEAVE,
+        ):
+            raise RuntimeError(f"Unknown message type {message.event}")
+        # Joins and leaves are broadcast to the room, so they are limited too.
+        if not await self._admit(chat_state, message.conversation_id):  # type: ignore
+            return
+        if message.event == EventType.CONVERSATION_MESSAGE:
+            message.username = self.username
+            await chat_state.send_message(message)
+        elif message.event == EventType.REQUEST_CONVERSATION_JOIN:
+            await chat_state.user_join(
+                self.username, message.conversation_id, since=message.since
+            )
+        else:
+            await chat_state.user_leave(self.username, message.conversation_id)
+
+    async def _admit(
+        self, chat_state: ChatServerInterface, conversation_id: str
+    ) -> bool:
+        """Apply the rate limit; a rejected event gets a system message back."""
+        try:
+            return await chat_state.admit(self.username, conversation_id)
+        except RateLimitExceeded as ex:
+            await self.send(
+                Message(
+                    username="_system",
+                    conversation_id=conversation_id,
+                    content=f"Rate limit exceeded, retry in {ex.retry_after:.1f}s",
+                )
+            )
+            return False
+
     async def receive(self) -> AsyncGenerator[ServerMessage, None]:  # type: ignore
         try:
             while True:
-                data = await self.ws.receive_json()
+                if self.binary:
+                    for message in unpack_client_events(await self.ws.receive_bytes()):
+                        yield message  # type: ignore[misc]
+                    continue
+                data = loads(await self.ws.receive_text())
                 if not isinstance(data, dict):
                     raise RuntimeError(
                         f"Server received malformed message. payload={data}"
                     )
-
-                match (data.get("event", None)):
-                    case EventType.CONVERSATION_MESSAGE:
-                        yield Message(**data)
-                    case EventType.REQUEST_CONVERSATION_JOIN:
-                        yield RequestJoinConversation(**data)
-                    case EventType.REQUEST_CONVERSATION_LEAVE:
-                        yield RequestLeaveConversation(**data)
-                    case _:
-                        raise RuntimeError(
-                            f"Server received unknown message. payload={data}"
-                        )
+                yield decode_client_message(data)  # type: ignore[misc]
         except StopAsyncIteration:
             logger.info(f"WebSocket for {self.username} stream ended gracefully.")
             pass
 
     async def send(self, message: ServerMessage) -> None:
-        await self.ws.send_text(message.json())
+        if self.binary:
+            await self.send_bytes(pack_event(message))
+        else:
+            await self.send_text(message.json())
+
+    async def send_text(self, data: str) -> None:
+        await self._enqueue(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._enqueue(data)
+
+    async def _enqueue(self, data: Frame) -> None:
+        """Queue a frame for the writer task, applying the overflow policy.
+
+        Before the handler is running frames are written straight to the socket.
+        """
+        if self._writer is None:
+            await self._write(data)
+            return
+        await self._queue(data)
+
+    async def _queue(self, data: Frame) -> None:
+        if self.evicted:
+            return
+        if self.outbound.full():
+            self.overflows += 1
+            if self.overflow == OverflowPolicy.BLOCK:
+                await self.outbound.put(data)
+                return
+            if self.overflow == OverflowPolicy.DISCONNECT:
+                self._drop()
+                self._evict(f"outbound queue full ({self.outbound.maxsize})")
+                return
+            self.outbound.get_nowait()
+            self.outbound.task_done()
+            self._drop()
+        self.outbound.put_nowait(data)
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        if self.dropped_frames is not None:
+            self.dropped_frames.inc()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self.outbound.qsize(),
+            "overflows": self.overflows,
+            "dropped": self.dropped,
+            "evicted": int(self.evicted),
+        }
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                data = await self.outbound.get()
+                try:
+                    if self.batch_window is not None:
+                        data = await self._batch(data)
+                    if self.send_seconds is None:
+                        await self._write(data)
+                        continue
+                    start = time.perf_counter()
+                    await self._write(data)
+                    self.send_seconds.observe(time.perf_counter() - start)
+                finally:
+                    self.outbound.task_done()
+        except Exception as ex:
+            logger.info(f" - {self.username} writer stopped: {ex!r}")
+            if self._task is not None:
+                self._task.cancel()
+
+    async def _write(self, data: Frame) -> None:
+        if isinstance(data, bytes):
+            await self.ws.send_bytes(data)
+        else:
+            await self.ws.send_text(data)
+
+    async def _batch(self, first: Frame) -> Frame:
+        """Coalesce frames queued within the batch window into one array frame."""
+        if self.outbound.qsize() < self.batch_size - 1:
+            await asyncio.sleep(self.batch_window)  # type: ignore[arg-type]
+        frames: list = [first]
+        while len(frames) < self.batch_size and not self.outbound.empty():
+            frames.append(self.outbound.get_nowait())
+            self.outbound.task_done()
+        if len(frames) == 1:
+            return first
+        if self.binary:
+            return pack_batch(frames)
+        return "[" + ",".join(frames) + "]"
+
+    async def drain(self) -> None:
+        """Wait until the writer has sent every queued frame."""
+        if self._writer is not None and not self._writer.done():
+            await self.outbound.join()
+
+    def _evict(self, reason: str) -> None:
+        if self.evicted:
+            return
+        self.evicted = True
+        logger.warning(f" - {self.username} evicted: {reason}")
+        if self._task is not None:
+            self._task.cancel()
 
     async def close(self):
-        if self.is_connected():
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        # Evicted clients get a close frame too.
+        if self.ws.state == WebSocketState.CONNECTED:
             await self.ws.close()
@@ -1,12 +1,33 @@
+import json
 import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
-from reflex_rxchat.server.websocket_handler import WebSocketClientHandler
-from reflex_rxchat.server.events import EventType, Message
+from reflex_rxchat.server.websocket_handler import (
+    OverflowPolicy,
+    WebSocketClientHandler,
+)
+from reflex_rxchat.server.events import (
+    EventType,
+    Message,
+    Ping,
+    Pong,
+    RequestJoinConversation,
+)
+from reflex_rxchat.server.metrics import Counter
+from reflex_rxchat.server.ratelimit import RateLimitExceeded
+from reflex_rxchat.server.wire import AVAILABLE, SUBPROTOCOL, pack_event
 from starlette.websockets import WebSocketState
 
 
+def text_frames(payloads: list) -> list:
+    """JSON-encode receive_text() side effects, passing exceptions through."""
+    return [
+        p if isinstance(p, type) and issubclass(p, BaseException) else json.dumps(p)
+        for p in payloads
+    ]
+
+
 @pytest.mark.asyncio
 async def test_handler_accepts_websocket_and_closes_on_cancel():
     # Mock websocket and chat_state
@@ -16,11 +37,11 @@ async def test_handler_accepts_websocket_and_closes_on_cancel():
     handler = WebSocketClientHandler(ws, username="testuser")
     chat_state.get_users = MagicMock(return_value={"testuser": handler})
 
-    # Make ws.receive_json() raise asyncio.CancelledError after first call
-    ws.receive_json.side_effect = asyncio.CancelledError
+    # Make ws.receive_text() raise asyncio.CancelledError after first call
+    ws.receive_text.side_effect = asyncio.CancelledError
     # Run the handler and ensure it handles cancellation
     await handler(chat_state)
-    ws.receive_json.assert_awaited_once()
+    ws.receive_text.assert_awaited_once()
     ws.accept.assert_awaited_once()
     ws.close.assert_awaited_once()
 
@@ -34,15 +55,17 @@ async def test_handler_conversation_message():
     chat_state.get_users = MagicMock(return_value={"alice": handler})
 
     # Simulate receiving a EventType.CONVERSATION_MESSAGE event once, then stop
-    ws.receive_json.side_effect = [
-        {
-            "event": EventType.CONVERSATION_MESSAGE,
-            "conversation_id": 123,
-            "username": "alice",
-            "content": "Hello",
-        },
-        asyncio.CancelledError,
-    ]
+    ws.receive_text.side_effect = text_frames(
+        [
+            {
+                "event": EventType.CONVERSATION_MESSAGE,
+                "conversation_id": 123,
+                "username": "alice",
+                "content": "Hello",
+            },
+            asyncio.CancelledError,
+        ]
+    )
 
     await handler(chat_state)
 
@@ -66,16 +89,18 @@ async def test_handler_join_and_leave_requests():
     chat_state.get_users = MagicMock(return_value={"alice": handler})
 
     # Simulate receiving a EventType.CONVERSATION_MESSAGE event once, then stop
-    ws.receive_json.side_effect = [
-        {
-            "event": EventType.REQUEST_CONVERSATION_JOIN,
-            "conversation_id": 123,
-        },
-        {
-            "event": EventType.REQUEST_CONVERSATION_LEAVE,
-            "conversation_id": 123,
-        },
-    ]
+    ws.receive_text.side_effect = text_frames(
+        [
+            {
+                "event": EventType.REQUEST_CONVERSATION_JOIN,
+                "conversation_id": 123,
+            },
+            {
+                "event": EventType.REQUEST_CONVERSATION_LEAVE,
+                "conversation_id": 123,
+            },
+        ]
+    )
 
     await handler(chat_state)
 
@@ -92,7 +117,9 @@ async def test_handler_unknown_event():
     chat_state.get_users = MagicMock(return_value={})
 
     # Simulate an unknown event
-    ws.receive_json.side_effect = [{"event": "unknown.event"}, asyncio.CancelledError]
+    ws.receive_text.side_effect = text_frames(
+        [{"event": "unknown.event"}, asyncio.CancelledError]
+    )
     handler = WebSocketClientHandler(ws, username="david")
     with pytest.raises(RuntimeError) as exc_info:
         await handler(chat_state)
@@ -107,7 +134,7 @@ async def test_handler_unknown_message():
     chat_state.get_users = MagicMock(return_value={})
 
     # Simulate an unknown event
-    ws.receive_json.side_effect = ["asdasdfasfsd", asyncio.CancelledError]
+    ws.receive_text.side_effect = text_frames(["asdasdfasfsd", asyncio.CancelledError])
     handler = WebSocketClientHandler(ws, username="david")
     with pytest.raises(RuntimeError) as exc_info:
         await handler(chat_state)
@@ -132,21 +159,23 @@ async def test_send_method():
 async def test_receive_method():
     ws = AsyncMock()
     # Simulate two messages, then raise CancelledError to break out of loop
-    ws.receive_json.side_effect = [
-        {
-            "event": EventType.CONVERSATION_MESSAGE,
-            "conversation_id": 123,
-            "username": "test user",
-            "content": "Hello",
-        },
-        {
-            "event": EventType.CONVERSATION_MESSAGE,
-            "conversation_id": 123,
-            "username": "test user",
-            "content": "world",
-        },
-        asyncio.CancelledError,
-    ]
+    ws.receive_text.side_effect = text_frames(
+        [
+            {
+                "event": EventType.CONVERSATION_MESSAGE,
+                "conversation_id": 123,
+                "username": "test user",
+                "content": "Hello",
+            },
+            {
+                "event": EventType.CONVERSATION_MESSAGE,
+                "conversation_id": 123,
+                "username": "test user",
+                "content": "world",
+            },
+            asyncio.CancelledError,
+        ]
+    )
 
     handler = WebSocketClientHandler(ws, username="frank")
 
@@ -161,3 +190,228 @@ async def test_receive_method():
     assert len(messages) == 2
     assert messages[0].event == EventType.CONVERSATION_MESSAGE
     assert messages[1].event == EventType.CONVERSATION_MESSAGE
+
+
+def running_handler(ws, overflow: OverflowPolicy, queue_size: int = 2):
+    """Handler with a stalled writer so frames stay in the outbound queue."""
+    handler = WebSocketClientHandler(
+        ws, username="grace", queue_size=queue_size, overflow=overflow
+    )
+    handler._writer = MagicMock()
+    handler._task = MagicMock()
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_send_queues_frames_for_writer():
+    ws = AsyncMock()
+    ws.state = WebSocketState.CONNECTED
+    chat_state = AsyncMock()
+    handler = WebSocketClientHandler(ws, username="heidi")
+    chat_state.get_users = MagicMock(return_value={"heidi": handler})
+
+    async def receive_text():
+        await handler.send_text("frame")
+        await asyncio.sleep(0)
+        raise asyncio.CancelledError
+
+    ws.receive_text.side_effect = receive_text
+    await handler(chat_state)
+    ws.send_text.assert_awaited_once_with("frame")
+
+
+@pytest.mark.asyncio
+async def test_overflow_drop_oldest():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+    for frame in ("a", "b", "c"):
+        await handler.send_text(frame)
+
+    assert [handler.outbound.get_nowait() for _ in range(2)] == ["b", "c"]
+    assert handler.stats()["dropped"] == 1
+    assert handler.stats()["overflows"] == 1
+    assert not handler.evicted
+
+
+@pytest.mark.asyncio
+async def test_dropped_frames_counter_accumulates():
+    counter = Counter("rxchat_dropped_frames_total", "Dropped frames.")
+    for username in ("a", "b"):
+        handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+        handler.dropped_frames = counter
+        for frame in ("a", "b", "c", "d"):
+            await handler.send_text(frame)
+
+    assert counter.value == 4
+
+
+@pytest.mark.asyncio
+async def test_overflow_disconnect_evicts_slow_consumer():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DISCONNECT)
+    for frame in ("a", "b", "c"):
+        await handler.send_text(frame)
+
+    assert handler.evicted
+    assert handler.stats()["dropped"] == 1
+    handler._task.cancel.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_overflow_block_waits_for_room():
+    handler = running_handler(AsyncMock(), OverflowPolicy.BLOCK, queue_size=1)
+    await handler.send_text("a")
+    blocked = asyncio.create_task(handler.send_text("b"))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    assert handler.outbound.get_nowait() == "a"
+    await blocked
+    assert handler.outbound.get_nowait() == "b"
+    assert handler.stats()["overflows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batching_coalesces_frames_into_array():
+    ws = AsyncMock()
+    handler = WebSocketClientHandler(
+        ws, username="ivan", batch_window=0.01, batch_size=3
+    )
+    for frame in ('{"n":1}', '{"n":2}', '{"n":3}', '{"n":4}'):
+        handler.outbound.put_nowait(frame)
+
+    writer = asyncio.create_task(handler._drain())
+    await asyncio.sleep(0.05)
+    writer.cancel()
+
+    assert [c.args[0] for c in ws.send_text.await_args_list] == [
+        '[{"n":1},{"n":2},{"n":3}]',
+        '{"n":4}',
+    ]
+
+
+@pytest.mark.skipif(not AVAILABLE, reason="msgpack is not installed")
+@pytest.mark.asyncio
+async def test_binary_handler_accepts_subprotocol_and_packs_frames():
+    ws = AsyncMock()
+    ws.state = WebSocketState.CONNECTED
+    chat_state = AsyncMock()
+    handler = WebSocketClientHandler(ws, username="judy", binary=True)
+    chat_state.get_users = MagicMock(return_value={"judy": handler})
+    reply = Message(conversation_id="Tech", username="bob", content="hey")
+
+    frames = [pack_event(Message(conversation_id="Tech", username="x", content="hi"))]
+
+    async def receive_bytes():
+        if frames:
+            return frames.pop()
+        await handler.send(reply)
+        await asyncio.sleep(0)
+        raise asyncio.CancelledError
+
+    ws.receive_bytes.side_effect = receive_bytes
+    await handler(chat_state)
+
+    ws.accept.assert_awaited_once_with(subprotocol=SUBPROTOCOL)
+    sent = chat_state.send_message.await_args.args[0]
+    assert (sent.username, sent.content) == ("judy", "hi")
+    ws.send_bytes.assert_awaited_once_with(pack_event(reply))
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_pings_then_evicts_silent_client():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+    handler.heartbeat_timeout = 10
+    start = handler.last_seen
+
+    assert await handler.heartbeat(start + 5)
+    assert handler.outbound.get_nowait() == Ping().json()
+
+    await handler.dispatch(AsyncMock(), Pong())
+    assert handler.last_seen > start
+    assert handler.last_active == start
+    assert await handler.heartbeat(handler.last_seen + 5)
+
+    assert not await handler.heartbeat(handler.last_seen + 11)
+    assert handler.evicted and not handler.is_connected()
+    handler._task.cancel.assert_called_once()
+    await handler.send_text("late")
+    assert handler.outbound.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_skips_ping_when_queue_is_full():
+    handler = running_handler(AsyncMock(), OverflowPolicy.BLOCK, queue_size=1)
+    handler.heartbeat_timeout = 10
+    await handler.send_text("stalled")
+
+    assert await asyncio.wait_for(handler.heartbeat(handler.last_seen + 5), 1)
+    assert handler.outbound.get_nowait() == "stalled"
+    assert handler.outbound.empty()
+
+
+@pytest.mark.asyncio
+async def test_evicted_client_gets_a_close_frame():
+    ws = AsyncMock()
+    ws.state = WebSocketState.CONNECTED
+    handler = running_handler(ws, OverflowPolicy.DISCONNECT, queue_size=1)
+    for frame in ("a", "b"):
+        await handler.send_text(frame)
+    assert handler.evicted
+
+    await handler.close()
+    ws.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_evicts_idle_client():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+    handler.idle_timeout = 60
+    chat_state = AsyncMock()
+
+    await handler.dispatch(chat_state, Pong())
+    assert await handler.heartbeat(handler.last_active + 30)
+    assert not await handler.heartbeat(handler.last_active + 61)
+    assert handler.evicted
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_messages_are_not_sent():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+    chat_state = AsyncMock()
+    message = Message(conversation_id="Tech", username="x", content="spam")
+
+    chat_state.admit.return_value = False
+    await handler.dispatch(chat_state, message)
+    chat_state.admit.side_effect = RateLimitExceeded("user grace", 1.5)
+    await handler.dispatch(chat_state, message)
+
+    chat_state.admit.assert_awaited_with("grace", "Tech")
+    chat_state.send_message.assert_not_awaited()
+    notice = json.loads(handler.outbound.get_nowait())
+    assert notice["username"] == "_system"
+    assert notice["content"] == "Rate limit exceeded, retry in 1.5s"
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_join_is_not_applied():
+    handler = running_handler(AsyncMock(), OverflowPolicy.DROP_OLDEST)
+    chat_state = AsyncMock()
+    chat_state.admit.side_effect = RateLimitExceeded("user grace", 2.0)
+
+    await handler.dispatch(chat_state, RequestJoinConversation(conversation_id="Tech"))
+
+    chat_state.user_join.assert_not_awaited()
+    notice = json.loads(handler.outbound.get_nowait())
+    assert notice["content"] == "Rate limit exceeded, retry in 2.0s"
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_queued_frames():
+    ws = AsyncMock()
+    handler = WebSocketClientHandler(ws, username="judy")
+    handler._writer = asyncio.create_task(handler._drain())
+    for frame in ("a", "b"):
+        await handler.send_text(frame)
+
+    await asyncio.wait_for(handler.drain(), 1)
+    assert [c.args[0] for c in ws.send_text.await_args_list] == ["a", "b"]
+    handler._writer.cancel()
@@ -0,0 +1,131 @@
+"""Compact binary encoding of chat events.
+
+Clients that negotiate the ``rxchat.msgpack`` WebSocket subprotocol exchange
+MessagePack binary frames instead of JSON text. An event is packed as an array
+of an integer event code followed by the model's field values in declaration
+order, so field names are never sent. Timestamps travel as epoch seconds.
+Batched frames are an array of such arrays.
+
+The subprotocol needs the ``msgpack`` package, from the ``fast`` extra.
+Without it servers decline the subprotocol and clients do not offer it, so
+every connection uses JSON.
+"""
+
+import struct
+from datetime import datetime
+from typing import Any, Callable, Union
+
+import reflex as rx
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None  # type: ignore[assignment]
+
+from .codec import decode_client_message, decode_server_message
+from .events import (
+    EventType,
+    ClientMessage,
+    ServerMessage,
+    Message,
+    RequestJoinConversation,
+    RequestLeaveConversation,
+    ResponseJoinConversation,
+    EventUserJoinConversation,
+    EventUserLeaveConversation,
+    EventConversationPresence,
+    Ping,
+    Pong,
+)
+
+SUBPROTOCOL: str = "rxchat.msgpack"
+# Whether the subprotocol can be negotiated.
+AVAILABLE: bool = msgpack is not None
+
+EVENT_CODES: dict[str, int] = {
+    EventType.REQUEST_CONVERSATION_JOIN: 1,
+    EventType.RESPONSE_CONVERSATION_JOIN: 2,
+    EventType.REQUEST_CONVERSATION_LEAVE: 3,
+    EventType.EVENT_CONVERSATION_JOIN: 4,
+    EventType.EVENT_CONVERSATION_LEAVE: 5,
+    EventType.CONVERSATION_MESSAGE: 6,
+    EventType.EVENT_CONVERSATION_PRESENCE: 7,
+    EventType.PING: 8,
+    EventType.PONG: 9,
+}
+
+MODELS: list[type[rx.Model]] = [
+    RequestJoinConversation,
+    ResponseJoinConversation,
+    RequestLeaveConversation,
+    EventUserJoinConversation,
+    EventUserLeaveConversation,
+    Message,
+    EventConversationPresence,
+    Ping,
+    Pong,
+]
+
+FIELDS: dict[int, tuple[str, list[str]]] = {
+    EVENT_CODES[m.__fields__["event"].default]: (
+        m.__fields__["event"].default,
+        [name for name in m.__fields__ if name not in ("id", "event")],
+    )
+    for m in MODELS
+}
+
+
+def _array_header(n: int) -> bytes:
+    if n < 16:
+        return bytes((0x90 | n,))
+    if n < 0x10000:
+        return struct.pack(">BH", 0xDC, n)
+    return struct.pack(">BI", 0xDD, n)
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def pack_event(message: Union[ClientMessage, ServerMessage]) -> bytes:
+    """Pack an event as ``[code, *field values]``."""
+    _, names = FIELDS[EVENT_CODES[message.event]]
+    return msgpack.packb(
+        [EVENT_CODES[message.event]] + [_value(getattr(message, n)) for n in names]
+    )
+
+
+def pack_batch(frames: list[bytes]) -> bytes:
+    """Join packed events into one array frame without unpacking them."""
+    return _array_header(len(frames)) + b"".join(frames)
+
+
+def _fields(item: list) -> dict:
+    if not item or type(item[0]) is not int or item[0] not in FIELDS:
+        raise RuntimeError(f"Server received unknown message. payload={item}")
+    event, names = FIELDS[item[0]]
+    data = dict(zip(names, item[1:]))
+    data["event"] = event
+    return data
+
+
+def unpack_client_events(data: bytes) -> list[ClientMessage]:
+    return _decode(data, decode_client_message)  # type: ignore[return-value]
+
+
+def unpack_server_events(data: bytes) -> list[ServerMessage]:
+    return _decode(data, decode_server_message)  # type: ignore[return-value]
+
+
+def _decode(data: bytes, decode: Callable[[dict], Any]) -> list:
+    try:
+        value = msgpack.unpackb(data)
+    except ValueError as ex:
+        raise RuntimeError(f"Server received malformed message: {ex}") from ex
+    if not isinstance(value, list) or not value:
+        raise RuntimeError(f"Server received malformed message. payload={value}")
+    if isinstance(value[0], list):
+        return [decode(_fields(item)) for item in value]
+    return [decode(_fields(value))]
@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime
+
+from reflex_rxchat.server.events import (
+    Message,
+    RequestJoinConversation,
+    ResponseJoinConversation,
+)
+from reflex_rxchat.server.wire import (
+    pack_batch,
+    pack_event,
+    unpack_client_events,
+    unpack_server_events,
+)
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_events_round_trip_without_field_names():
+    message = Message(
+        conversation_id="Tech",
+        username="alice",
+        content="hello",
+        timestamp=datetime(2024, 1, 2, 3, 4, 5, 600000),
+        seq=7,
+    )
+    packed = pack_event(message)
+
+    assert b"username" not in packed
+    assert len(packed) < len(message.json()) / 2
+    assert unpack_server_events(packed) == [message]
+    assert unpack_client_events(
+        pack_event(RequestJoinConversation(conversation_id="Tech"))
+    ) == [RequestJoinConversation(conversation_id="Tech")]
+
+
+def test_batches_unpack_to_every_event():
+    events = [
+        ResponseJoinConversation(conversation_id="Tech", users=["a", "b"]),
+        Message(conversation_id="Tech", username="a", content="hi"),
+    ]
+    batch = pack_batch([pack_event(e) for e in events])
+    assert [e.event for e in unpack_server_events(batch)] == [e.event for e in events]
+
+
+def test_unknown_event_codes_are_rejected():
+    with pytest.raises(RuntimeError, match="unknown message"):
+        unpack_client_events(msgpack.packb([2, "Tech", ["a"]]))
+    with pytest.raises(RuntimeError, match="malformed"):
+        unpack_server_events(msgpack.packb("hello"))
+
+
+def test_truncated_frames_are_malformed():
+    packed = pack_event(Message(conversation_id="Tech", username="a", content="hi"))
+    with pytest.raises(RuntimeError, match="malformed"):
+        unpack_client_events(packed[:-3])
+
+
+def test_long_batches_use_wider_array_headers():
+    frames = [pack_event(Message(conversation_id="c", username="a", content="x"))] * 20
+    assert msgpack.unpackb(pack_batch(frames)) == [msgpack.unpackb(frames[0])] * 20